@@ -0,0 +1,72 @@
+"""Admission control for the prediction endpoint.
+
+Each worker runs at most ``max_concurrency`` predictions at a time and lets at
+most ``max_queue`` more wait for a slot, for no longer than ``max_wait`` seconds
+or the client's own deadline. Everything beyond that is rejected immediately
+instead of piling up in the threadpool, or, when degrading is enabled, served
+a cheap answer that never touches the model.
+"""
+import asyncio
+
+import metrics
+
+TIMEOUT_HEADER = "x-request-timeout"  # Seconds the client is willing to wait
+
+
+def parse_timeout(value):
+    """Return the client timeout in seconds, or None if absent or malformed."""
+    if not value:
+        return None
+    try:
+        timeout = float(value)
+    except ValueError:
+        return None
+    return timeout if timeout > 0 else None
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency, max_queue, max_wait, degrade=False):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.degrade = degrade
+        self.in_flight = 0
+        self.queued = 0
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        # Created lazily so it belongs to the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def admit(self, timeout=None):
+        """Wait for a slot; returns False if the request should be shed."""
+        semaphore = self.semaphore
+        if not semaphore.locked():
+            # A slot is free, so this completes without yielding to the loop
+            await semaphore.acquire()
+        else:
+            if self.queued >= self.max_queue:
+                return False
+            wait = min(self.max_wait, timeout) if timeout is not None else self.max_wait
+
+            self.queued += 1
+            metrics.ADMISSION_QUEUED.inc()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), wait)
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.queued -= 1
+                metrics.ADMISSION_QUEUED.dec()
+
+        self.in_flight += 1
+        metrics.ADMISSION_IN_FLIGHT.inc()
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+        metrics.ADMISSION_IN_FLIGHT.dec()
+        self.semaphore.release()
@@ -0,0 +1,64 @@
+"""Periodic background jobs that run in a daemon thread of each API worker."""
+import fcntl
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+JOB_LOCK_DIR = os.getenv("JOB_LOCK_DIR", tempfile.gettempdir())
+
+
+@contextmanager
+def leader_lock(name):
+    """Non-blocking per-host lock; yields True in the one worker that holds it."""
+    with open(os.path.join(JOB_LOCK_DIR, f"smartbasket-{name}.lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class PeriodicJob:
+    """Call fn immediately and then every interval seconds until stopped.
+
+    If wake is given, setting that event runs fn early instead of waiting out
+    the interval.
+    """
+
+    def __init__(self, name, interval, fn, wake=None):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.wake = wake
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=f"job-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.wake is not None:
+            self.wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.wake is not None:
+                # Cleared before running so a wake-up during fn triggers the next run
+                self.wake.clear()
+            try:
+                self.fn()
+            except Exception as e:
+                logger.error(f"Background job {self.name} failed: {str(e)}")
+            (self.wake if self.wake is not None else self._stop).wait(self.interval)
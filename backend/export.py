@@ -0,0 +1,177 @@
+"""Streaming exports of transactions and prediction logs.
+
+Rows are read with a server-side cursor (``yield_per``) and encoded one chunk
+at a time as NDJSON, CSV or Parquet, so memory stays flat however large the
+table is. Parquet needs the optional ``pyarrow`` package.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+import models
+
+CHUNK_ROWS = 1000
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# dataset -> (model, time column used for date-range filters, exported columns)
+EXPORTS = {
+    "transactions": (
+        models.Transaction,
+        "date",
+        ("id", "user_id", "date", "items"),
+    ),
+    "predictions": (
+        models.PredictionLog,
+        "timestamp",
+        ("id", "user_id", "timestamp", "input_data", "output_data", "probabilities", "feedback"),
+    ),
+    "item-feedback": (
+        models.ItemFeedbackStats,
+        "updated_at",
+        ("item", "shown", "accepted", "rejected", "updated_at"),
+    ),
+}
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+def parquet_available():
+    return pa is not None
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def iter_chunks(session_factory, dataset, start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """Yield lists of row tuples, ordered by key, holding one chunk in memory at a time."""
+    model, time_field, columns = EXPORTS[dataset]
+    time_column = getattr(model, time_field)
+    # The first exported column is the table's key
+    stmt = select(*[getattr(model, column) for column in columns]).order_by(getattr(model, columns[0]))
+    if start is not None:
+        stmt = stmt.where(time_column >= start)
+    if end is not None:
+        stmt = stmt.where(time_column < end)
+
+    # The response outlives the request's session, so the stream owns its own
+    db = session_factory()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=chunk_rows))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _ndjson(chunks, columns):
+    for chunk in chunks:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in chunk
+        ).encode()
+
+
+def _csv(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        for row in chunk:
+            # List-valued columns are written as JSON arrays
+            writer.writerow([
+                json.dumps(value) if isinstance(value, (list, dict)) else
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in row
+            ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _parquet_schema(dataset):
+    strings = pa.list_(pa.string())
+    if dataset == "transactions":
+        return pa.schema([
+            ("id", pa.int64()), ("user_id", pa.int64()), ("date", pa.timestamp("us")), ("items", strings),
+        ])
+    if dataset == "item-feedback":
+        return pa.schema([
+            ("item", pa.string()), ("shown", pa.int64()), ("accepted", pa.int64()), ("rejected", pa.int64()),
+            ("updated_at", pa.timestamp("us")),
+        ])
+    return pa.schema([
+        ("id", pa.int64()), ("user_id", pa.int64()), ("timestamp", pa.timestamp("us")),
+        ("input_data", strings), ("output_data", strings),
+        ("probabilities", pa.list_(pa.float64())), ("feedback", pa.string()),
+    ])
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain.
+
+    tell() keeps counting across drains so the Parquet footer offsets stay valid.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet(chunks, columns, dataset):
+    schema = _parquet_schema(dataset)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        # One row group per chunk
+        for chunk in chunks:
+            batch = {column: [row[i] for row in chunk] for i, column in enumerate(columns)}
+            writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream(session_factory, dataset, fmt, start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """Return an iterator of encoded byte chunks for a StreamingResponse."""
+    columns = EXPORTS[dataset][2]
+    chunks = iter_chunks(session_factory, dataset, start, end, chunk_rows)
+    if fmt == "ndjson":
+        return _ndjson(chunks, columns)
+    if fmt == "csv":
+        return _csv(chunks, columns)
+    return _parquet(chunks, columns, dataset)
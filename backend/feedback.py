@@ -0,0 +1,152 @@
+"""Batched prediction feedback.
+
+Feedback events are buffered in memory and applied in bulk by the
+feedback-flush background job, on a short timer or as soon as the buffer
+fills. Each flush drops events for predictions the sender doesn't own, then
+runs one UPDATE ... RETURNING per chunk of prediction ids, which only touches
+logs that have no feedback yet, and counts just the rows it changed into
+item_feedback_stats, the per-item acceptance table that training reads
+instead of scanning prediction_logs. The counts are merged with an upsert
+that increments in SQL, so workers flushing the same items concurrently
+don't overwrite each other. Only the first feedback per prediction counts.
+Events still buffered when a worker dies are lost.
+"""
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+import metrics
+import models
+
+logger = logging.getLogger(__name__)
+
+IN_CHUNK = 500
+
+# INSERT ... ON CONFLICT DO UPDATE constructs for the databases the backend runs on
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def feedback_value(signal, accepted_item=None):
+    """What is stored in PredictionLog.feedback, e.g. "accepted:whole milk"."""
+    return f"{signal}:{accepted_item}" if accepted_item else signal
+
+
+class FeedbackBuffer:
+    def __init__(self, session_factory, flush_size=500):
+        self.session_factory = session_factory
+        self.flush_size = flush_size
+        # Set once flush_size events are waiting; the flush job wakes on it
+        self.full = threading.Event()
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def add(self, user_id, events):
+        """Buffer (prediction_id, accepted_item, signal) events from one user."""
+        with self._lock:
+            self._events.extend((user_id, *event) for event in events)
+            size = len(self._events)
+        metrics.FEEDBACK_EVENTS.labels("buffered").inc(len(events))
+        if size >= self.flush_size:
+            self.full.set()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+            db = self.session_factory()
+            try:
+                applied = self._apply(db, events)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to apply {len(events)} feedback events: {str(e)}")
+                metrics.FEEDBACK_EVENTS.labels("failed").inc(len(events))
+                return 0
+            finally:
+                db.close()
+            metrics.FEEDBACK_EVENTS.labels("applied").inc(applied)
+            metrics.FEEDBACK_EVENTS.labels("ignored").inc(len(events) - applied)
+            return applied
+
+    def _apply(self, db, events):
+        log = models.PredictionLog.__table__
+        requested = list({prediction_id for _, prediction_id, _, _ in events})
+        owners = {}
+        for start in range(0, len(requested), IN_CHUNK):
+            chunk = requested[start:start + IN_CHUNK]
+            owners.update(db.execute(select(log.c.id, log.c.user_id).where(log.c.id.in_(chunk))).all())
+
+        # Events from other users are dropped before collapsing so they can't
+        # displace the owner's; the first owned event per prediction wins
+        first = {}
+        for user_id, prediction_id, accepted_item, signal in events:
+            if owners.get(prediction_id) == user_id:
+                first.setdefault(prediction_id, (accepted_item, signal))
+
+        ids = list(first)
+        applied = 0
+        shown = Counter()
+        accepted = Counter()
+        rejected = Counter()
+        for start in range(0, len(ids), IN_CHUNK):
+            chunk = ids[start:start + IN_CHUNK]
+            values = {
+                prediction_id: feedback_value(first[prediction_id][1], first[prediction_id][0])
+                for prediction_id in chunk
+            }
+            # First-feedback-wins across batches is checked by the UPDATE itself, so
+            # a prediction raced on by two workers is only returned (and counted) once
+            changed = db.execute(
+                update(log)
+                .where(log.c.id.in_(chunk), log.c.feedback.is_(None))
+                .values(feedback=case(values, value=log.c.id))
+                .returning(log.c.id, log.c.output_data)
+            )
+            for prediction_id, output_data in changed:
+                accepted_item, signal = first[prediction_id]
+                applied += 1
+                for item in output_data or []:
+                    shown[item] += 1
+                    if signal == "accepted" and item == accepted_item:
+                        accepted[item] += 1
+                    elif signal == "rejected":
+                        rejected[item] += 1
+
+        if shown:
+            self._merge_stats(db, shown, accepted, rejected)
+        db.commit()
+        return applied
+
+    def _merge_stats(self, db, shown, accepted, rejected):
+        stats = models.ItemFeedbackStats.__table__
+        insert = UPSERT_INSERTS[db.get_bind().dialect.name]
+        now = datetime.now()
+        # Sorted so concurrent flushes lock shared rows in the same order
+        items = sorted(shown)
+        for start in range(0, len(items), IN_CHUNK):
+            stmt = insert(stats)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[stats.c.item],
+                set_={
+                    "shown": stats.c.shown + stmt.excluded.shown,
+                    "accepted": stats.c.accepted + stmt.excluded.accepted,
+                    "rejected": stats.c.rejected + stmt.excluded.rejected,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            db.execute(stmt, [
+                {
+                    "item": item,
+                    "shown": shown[item],
+                    "accepted": accepted[item],
+                    "rejected": rejected[item],
+                    "updated_at": now,
+                }
+                for item in items[start:start + IN_CHUNK]
+            ])
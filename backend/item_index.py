@@ -0,0 +1,133 @@
+"""In-memory item search index for autocomplete.
+
+Built from the model's item vocabulary at load time. Queries are answered
+from a sorted prefix list (whole names and individual words, via bisect) and
+fall back to trigram similarity for typos. Results are ranked by match
+quality, then by how often the item appears in transactions.
+
+Empty and one- or two-character queries match a large share of the catalog,
+so their best MAX_RESULTS are ranked ahead of time whenever popularity
+changes, and answering them is a slice.
+"""
+import hashlib
+import heapq
+import json
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+
+FUZZY_THRESHOLD = 0.3
+SHORT_PREFIX = 2  # Queries up to this length are answered from precomputed rankings
+MAX_RESULTS = 50  # Results kept per precomputed ranking; larger limits fall back to a scan
+
+# Match tiers; fuzzy matches score their trigram similarity, always below these
+NAME_PREFIX = 3.0
+WORD_PREFIX = 2.0
+
+
+# Everything derived from one set of popularity counts, published as one reference
+Rankings = namedtuple("Rankings", ["revision", "popularity", "by_popularity", "short_rankings"])
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ItemIndex:
+    def __init__(self, items, popularity=None):
+        self.items = sorted(items)
+        names = [normalize(item) for item in self.items]
+
+        prefix_entries = set()
+        self._trigrams = defaultdict(set)
+        self._gram_counts = []
+        for item_id, name in enumerate(names):
+            prefix_entries.add((name, item_id, NAME_PREFIX))
+            for word in filter(None, re.split(r"[^\w.]+", name)):
+                prefix_entries.add((word, item_id, WORD_PREFIX))
+            grams = trigrams(name)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._trigrams[gram].add(item_id)
+        self._prefix_entries = sorted(prefix_entries)
+        self._prefix_keys = [key for key, _, _ in self._prefix_entries]
+
+        self._short_prefixes = defaultdict(dict)
+        for key, item_id, tier in self._prefix_entries:
+            for length in range(1, min(len(key), SHORT_PREFIX) + 1):
+                matches = self._short_prefixes[key[:length]]
+                matches[item_id] = max(tier, matches.get(item_id, 0.0))
+
+        self.set_popularity(popularity or {})
+
+    def set_popularity(self, popularity):
+        """Swap in new transaction counts; changes the revision used for ETags."""
+        counts = [int(popularity.get(item, 0)) for item in self.items]
+        digest = hashlib.sha1(json.dumps([self.items, counts]).encode()).hexdigest()[:16]
+        by_popularity = sorted(range(len(self.items)), key=lambda item_id: (-counts[item_id], self.items[item_id]))
+        short_rankings = {
+            prefix: [(item_id, matches[item_id]) for item_id in self._rank(matches, MAX_RESULTS, counts)]
+            for prefix, matches in self._short_prefixes.items()
+        }
+        # One assignment, so a reader never pairs a revision with other rankings
+        self.rankings = Rankings(digest, counts, by_popularity, short_rankings)
+
+    @property
+    def revision(self):
+        return self.rankings.revision
+
+    def most_popular(self, limit):
+        """Return [(item, popularity), ...] for the most purchased items."""
+        rankings = self.rankings
+        return [(self.items[item_id], rankings.popularity[item_id]) for item_id in rankings.by_popularity[:limit]]
+
+    def _rank(self, matches, limit, counts):
+        return heapq.nsmallest(
+            limit, matches, key=lambda item_id: (-matches[item_id], -counts[item_id], self.items[item_id])
+        )
+
+    def _prefix_matches(self, query, limit, short_rankings):
+        if len(query) <= SHORT_PREFIX and limit <= MAX_RESULTS:
+            return dict(short_rankings.get(query, ())[:limit])
+        matches = {}
+        i = bisect_left(self._prefix_keys, query)
+        while i < len(self._prefix_keys) and self._prefix_keys[i].startswith(query):
+            _, item_id, tier = self._prefix_entries[i]
+            matches[item_id] = max(tier, matches.get(item_id, 0.0))
+            i += 1
+        return matches
+
+    def _fuzzy_matches(self, query):
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            for item_id in self._trigrams.get(gram, ()):
+                shared[item_id] += 1
+        matches = {}
+        for item_id, common in shared.items():
+            similarity = common / (len(query_grams) + self._gram_counts[item_id] - common)
+            if similarity >= FUZZY_THRESHOLD:
+                matches[item_id] = similarity
+        return matches
+
+    def search(self, query, limit=10, rankings=None):
+        """Return [(item, popularity), ...] best matches first.
+
+        Pass the rankings whose revision was used for an ETag so the results match it.
+        """
+        query = normalize(query)
+        _, popularity, by_popularity, short_rankings = rankings or self.rankings
+        if not query:
+            ranked = by_popularity[:limit]
+        else:
+            matches = self._prefix_matches(query, limit, short_rankings)
+            if len(matches) < limit:
+                for item_id, similarity in self._fuzzy_matches(query).items():
+                    matches.setdefault(item_id, similarity)
+            ranked = self._rank(matches, limit, popularity)
+        return [(self.items[item_id], popularity[item_id]) for item_id in ranked]
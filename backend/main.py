@@ -1,27 +1,41 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
-import tensorflow as tf
 import numpy as np
 import pickle
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import jwt
 from passlib.context import CryptContext
 from fastapi.logger import logger
 import json
 import logging
-logging.basicConfig(level=logging.DEBUG)
+import time
+import hashlib
+import threading
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 
 # Import database models and schemas
 from database import SessionLocal, engine
 import models, schemas
+import admission
+import background
+import export
+import feedback
+import item_index
+import metrics
+import partitions
+import popular
+import shadow
+import shared_model
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Create database tables (prediction_logs is range-partitioned on PostgreSQL)
+partitions.create_all(engine, models.Base.metadata)
 
 app = FastAPI(
     title="SmartBasket API",
@@ -38,6 +52,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admission control for predictions (per worker)
+PREDICTION_PATH = "/api/v1/predictions/next-item"
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", str(os.cpu_count() or 1)))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "2"))
+ADMISSION_DEGRADE = os.getenv("ADMISSION_DEGRADE", "false").lower() in ("1", "true", "yes")
+ADMISSION_SHED_STATUS = int(os.getenv("ADMISSION_SHED_STATUS", "503"))  # or 429
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+admission_controller = admission.AdmissionController(
+    ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT_SECONDS, ADMISSION_DEGRADE
+)
+
+# Registered before the metrics middleware so shed responses are still counted
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    if request.url.path != PREDICTION_PATH or request.method != "POST":
+        return await call_next(request)
+    
+    request.state.route_path = PREDICTION_PATH
+    timeout = admission.parse_timeout(request.headers.get(admission.TIMEOUT_HEADER))
+    request.state.deadline = time.monotonic() + timeout if timeout is not None else None
+    
+    if await admission_controller.admit(timeout):
+        metrics.ADMISSION.labels("admitted").inc()
+        try:
+            return await call_next(request)
+        finally:
+            admission_controller.release()
+    
+    if admission_controller.degrade:
+        # Answered on the event loop: overflow must not queue for the threadpool
+        return await degraded_prediction(request)
+    
+    return shed_response()
+
+def shed_response():
+    metrics.ADMISSION.labels("shed").inc()
+    return JSONResponse(
+        status_code=ADMISSION_SHED_STATUS,
+        content={"detail": "Prediction service is overloaded, retry later"},
+        headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)}
+    )
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template rather than raw path to keep cardinality bounded
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else getattr(request.state, "route_path", "unmatched")
+    metrics.REQUEST_LATENCY.labels(route_path).observe(time.perf_counter() - start)
+    metrics.REQUESTS.labels(request.method, route_path, str(response.status_code)).inc()
+    return response
+
 # Security
 SECRET_KEY = "your-secret-key-here" 
 ALGORITHM = "HS256"
@@ -88,57 +157,276 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise credentials_exception
     return user
 
+def get_prediction_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """get_current_user, timed as the "auth" stage of the prediction pipeline."""
+    with metrics.stage_timer("auth"):
+        return get_current_user(token, db)
+
 # Load ML models and encoders
+SHARED_MODEL_DIR = os.getenv("SHARED_MODEL_DIR")  # e.g. /dev/shm/smartbasket to share weights across workers
+SHARED_MODEL_CHECK_SECONDS = float(os.getenv("SHARED_MODEL_CHECK_SECONDS", "1"))
+
+def get_model_version(model_path):
+    model_file = f"{model_path}/grocery_predictor_model.h5"
+    mtime = int(os.path.getmtime(model_file)) if os.path.exists(model_file) else 0
+    return f"{os.path.basename(os.path.realpath(model_path))}-{mtime}"
+
+def load_item_popularity():
+    db = SessionLocal()
+    try:
+        return popular.item_popularity(db)
+    except Exception as e:
+        logger.error(f"Failed to load item popularity: {str(e)}")
+        return {}
+    finally:
+        db.close()
+
+class ModelSnapshot:
+    """One loaded model version and the lookups derived from it.
+
+    Never mutated after construction; a reload builds a new snapshot and swaps
+    the reference, so a request that reads it once sees a consistent set.
+    """
+
+    def __init__(self, version=None, model=None, mlb=None, unique_items=None, index=None, primary=True):
+        self.version = version
+        self.model = model
+        self.mlb = mlb
+        self.unique_items = unique_items
+        self.primary = primary
+        self.idx_to_item = {int(v): k for k, v in (unique_items or {}).items()}
+        self.item_index = index or item_index.ItemIndex([])
+
+    @property
+    def ready(self):
+        return self.model is not None and self.mlb is not None and self.unique_items is not None
+
+    def predict_top_k(self, baskets, k=5):
+        """Score several baskets in one forward pass; returns [(item, probability %), ...] per basket."""
+        prediction = self.model.predict(self.mlb.transform(baskets), verbose=0)
+        if self.primary:
+            # A shadowed candidate's passes would skew the serving model's histogram
+            metrics.BATCH_SIZE.observe(len(baskets))
+        k = min(k, prediction.shape[1])
+        top = np.argpartition(prediction, -k, axis=1)[:, -k:]
+        results = []
+        for row, indices in zip(prediction, top):
+            indices = indices[np.argsort(row[indices])[::-1]]
+            results.append([
+                (self.idx_to_item.get(int(idx), f"Unknown-{idx}"), float(row[idx]) * 100)
+                for idx in indices
+            ])
+        return results
+
 class PredictionModel:
-    def __init__(self):
-        self.model = None
-        self.mlb = None
-        self.unique_items = None
+    def __init__(self, model_path=None, primary=True, shared_dir=SHARED_MODEL_DIR):
+        # Only the primary model feeds item search and reports metrics
+        self.model_path = model_path or os.getenv("MODEL_PATH", "models/current")
+        self.primary = primary
+        self.shared_dir = shared_dir
+        self.snapshot = ModelSnapshot(primary=primary)
+        self._reload_lock = threading.Lock()
+        self._next_check = 0.0
         self.load_model()
 
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def predict_top_k(self, baskets, k=5):
+        return self.snapshot.predict_top_k(baskets, k)
+
     def load_model(self):
-        model_path = os.getenv("MODEL_PATH", "models/current")
+        with self._reload_lock:
+            if self.shared_dir:
+                loaded = self.attach_shared(self.model_path)
+            else:
+                loaded = self.load_from_disk(self.model_path)
+            if loaded is not None:
+                self.swap(*loaded)
+
+    def swap(self, version, model, mlb, unique_items):
+        """Build the derived lookups, then publish the new snapshot in one assignment."""
+        index = None
+        if self.primary:
+            index = item_index.ItemIndex(list(unique_items), load_item_popularity())
+        self.snapshot = ModelSnapshot(version, model, mlb, unique_items, index, self.primary)
+        if self.primary:
+            metrics.set_model_info(version, len(unique_items))
+
+    def load_from_disk(self, model_path):
+        """Return (version, model, mlb, unique_items), or None if loading failed."""
         logger.info(f"Attempting to load model from: {model_path}")
         
         try:
             if not os.path.exists(f"{model_path}/grocery_predictor_model.h5"):
                 logger.error(f"Model file not found at {model_path}/grocery_predictor_model.h5")
-                return
+                return None
                 
+            # Imported lazily so workers attached to shared weights never load TensorFlow
+            import tensorflow as tf
+
             # Load without compilation
-            self.model = tf.keras.models.load_model(f"{model_path}/grocery_predictor_model.h5", compile=False)
+            model = tf.keras.models.load_model(f"{model_path}/grocery_predictor_model.h5", compile=False)
             logger.info("Model loaded successfully")
             
             if not os.path.exists(f"{model_path}/mlb_encoder.pkl"):
                 logger.error(f"MultiLabelBinarizer file not found at {model_path}/mlb_encoder.pkl")
-                return
+                return None
             with open(f"{model_path}/mlb_encoder.pkl", "rb") as f:
-                self.mlb = pickle.load(f)
+                mlb = pickle.load(f)
             logger.info("MultiLabelBinarizer loaded successfully")
             
             if not os.path.exists(f"{model_path}/item_mapping.json"):
                 logger.error(f"Item mapping file not found at {model_path}/item_mapping.json")
-                return
+                return None
             with open(f"{model_path}/item_mapping.json", "r") as f:
-                self.unique_items = json.load(f)
+                unique_items = json.load(f)
             logger.info("Item mapping loaded successfully")
-            logger.info(f"Loaded {len(self.unique_items)} unique items")
+            logger.info(f"Loaded {len(unique_items)} unique items")
             
             # Temporarily comment out the sample prediction validation
-            # sample_input = np.zeros((1, len(self.mlb.classes_)))
-            # sample_prediction = self.model.predict(sample_input)
+            # sample_input = np.zeros((1, len(mlb.classes_)))
+            # sample_prediction = model.predict(sample_input)
             # logger.info(f"Model validation successful: prediction shape {sample_prediction.shape}")
             
+            return get_model_version(model_path), model, mlb, unique_items
         except Exception as e:
             logger.error(f"Failed to load model components: {str(e)}")
-            self.model = None
-            self.mlb = None
-            self.unique_items = None
+            return None
+
+    def attach_shared(self, model_path):
+        """Attach to the weights in shared_dir, publishing model_path first if it is newer."""
+        version = get_model_version(model_path)
+        try:
+            with shared_model.publish_lock(self.shared_dir):
+                if shared_model.current_version(self.shared_dir) != version:
+                    loaded = self.load_from_disk(model_path)
+                    if loaded is None:
+                        return None
+                    _, model, mlb, unique_items = loaded
+                    shared_model.publish(model, mlb, unique_items, version, self.shared_dir)
+            attached = shared_model.attach(self.shared_dir)
+            logger.info(f"Attached to shared model version {attached[0]}")
+            return attached
+        except Exception as e:
+            logger.error(f"Failed to attach to shared model: {str(e)}")
+            return None
+
+    def refresh_if_stale(self):
+        """Re-attach when another worker has published a newer version.
+
+        CURRENT is read at most every SHARED_MODEL_CHECK_SECONDS, and only one
+        thread rebuilds; the others keep serving the old snapshot meanwhile.
+        """
+        if not self.shared_dir:
+            return
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + SHARED_MODEL_CHECK_SECONDS
+        if shared_model.current_version(self.shared_dir) == self.snapshot.version:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            if shared_model.current_version(self.shared_dir) != self.snapshot.version:
+                self.swap(*shared_model.attach(self.shared_dir))
+                logger.info(f"Re-attached to shared model version {self.snapshot.version}")
+        except Exception as e:
+            logger.error(f"Failed to re-attach to shared model: {str(e)}")
+        finally:
+            self._reload_lock.release()
 
 
 
 prediction_model = PredictionModel()
 
+# Shadow evaluation: a candidate model scores sampled live baskets off the response path
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.05"))
+SHADOW_PURCHASE_WINDOW_DAYS = int(os.getenv("SHADOW_PURCHASE_WINDOW_DAYS", "7"))
+# The candidate gets its own shared directory (publishing prunes every other
+# version in a directory), so workers map its weights instead of each loading TensorFlow
+SHADOW_SHARED_MODEL_DIR = os.getenv("SHADOW_SHARED_MODEL_DIR", f"{SHARED_MODEL_DIR}-shadow" if SHARED_MODEL_DIR else None)
+
+shadow_evaluator = None
+if SHADOW_MODEL_PATH:
+    candidate_model = PredictionModel(SHADOW_MODEL_PATH, primary=False, shared_dir=SHADOW_SHARED_MODEL_DIR)
+    if candidate_model.snapshot.ready:
+        shadow_evaluator = shadow.ShadowEvaluator(candidate_model, SessionLocal, SHADOW_SAMPLE_RATE)
+        logger.info(f"Shadow evaluating candidate {candidate_model.version} on {SHADOW_SAMPLE_RATE:.0%} of traffic")
+
+# Precomputed predictions for the most frequent starting baskets
+POPULAR_REFRESH_SECONDS = float(os.getenv("POPULAR_REFRESH_SECONDS", "300"))  # 0 disables
+POPULAR_TOP_N = int(os.getenv("POPULAR_TOP_N", "10000"))
+POPULAR_MAX_BASKET_ITEMS = int(os.getenv("POPULAR_MAX_BASKET_ITEMS", "3"))
+
+popular_table = popular.PopularTable()
+
+def refresh_popular_baskets():
+    prediction_model.refresh_if_stale()
+    snapshot = prediction_model.snapshot
+    db = SessionLocal()
+    try:
+        with background.leader_lock("popular-baskets") as is_leader:
+            if is_leader:
+                popular.refresh(db, snapshot, POPULAR_TOP_N, POPULAR_MAX_BASKET_ITEMS)
+        if popular_table.is_stale(db, snapshot.version):
+            popular_table.load(db, snapshot.version, POPULAR_TOP_N)
+            metrics.POPULAR_ENTRIES.set(len(popular_table.entries))
+            snapshot.item_index.set_popularity(popular.item_popularity(db))
+    finally:
+        db.close()
+
+popular_job = background.PeriodicJob("popular-baskets", POPULAR_REFRESH_SECONDS, refresh_popular_baskets)
+
+# Prediction log partitions, retention and daily rollups
+PREDICTION_LOG_MAINTENANCE_SECONDS = float(os.getenv("PREDICTION_LOG_MAINTENANCE_SECONDS", "3600"))  # 0 disables
+PREDICTION_LOG_RETENTION_DAYS = int(os.getenv("PREDICTION_LOG_RETENTION_DAYS", "180"))  # 0 keeps everything
+
+def maintain_prediction_logs():
+    with background.leader_lock("prediction-log-maintenance") as is_leader:
+        if not is_leader:
+            return
+        partitions.ensure_partitions(engine)
+        if PREDICTION_LOG_RETENTION_DAYS > 0:
+            partitions.drop_expired(engine, PREDICTION_LOG_RETENTION_DAYS)
+        db = SessionLocal()
+        try:
+            partitions.rollup(db)
+        finally:
+            db.close()
+
+maintenance_job = background.PeriodicJob(
+    "prediction-log-maintenance", PREDICTION_LOG_MAINTENANCE_SECONDS, maintain_prediction_logs
+)
+
+# Prediction feedback is buffered and applied in bulk
+FEEDBACK_FLUSH_SIZE = int(os.getenv("FEEDBACK_FLUSH_SIZE", "500"))
+FEEDBACK_FLUSH_SECONDS = float(os.getenv("FEEDBACK_FLUSH_SECONDS", "2"))
+if FEEDBACK_FLUSH_SECONDS <= 0:
+    # The flush job is the only thing that drains the buffer; it can't be disabled
+    raise ValueError(f"FEEDBACK_FLUSH_SECONDS must be positive, got {FEEDBACK_FLUSH_SECONDS}")
+
+feedback_buffer = feedback.FeedbackBuffer(SessionLocal, FEEDBACK_FLUSH_SIZE)
+feedback_job = background.PeriodicJob(
+    "feedback-flush", FEEDBACK_FLUSH_SECONDS, feedback_buffer.flush, wake=feedback_buffer.full
+)
+
+@app.on_event("startup")
+def start_background_jobs():
+    popular_job.start()
+    maintenance_job.start()
+    feedback_job.start()
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    popular_job.stop()
+    maintenance_job.stop()
+    feedback_job.stop()
+    feedback_buffer.flush()
+
 # API Routes
 @app.post("/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
@@ -217,94 +505,252 @@ def read_transactions(
     
     return transactions
 
+# Item endpoints
+ITEM_SEARCH_MAX_AGE = 300
+
+@app.get("/api/v1/items/search", response_model=List[schemas.ItemSearchResult])
+def search_items(
+    request: Request,
+    response: Response,
+    q: str = "",
+    limit: int = Query(10, ge=1, le=50)
+):
+    index = prediction_model.snapshot.item_index
+    # Read once: results only change with the revision, so that plus the query is the ETag
+    rankings = index.rankings
+    etag = '"' + hashlib.sha1(f"{rankings.revision}|{q}|{limit}".encode()).hexdigest()[:20] + '"'
+    cache_headers = {"ETag": etag, "Cache-Control": f"public, max-age={ITEM_SEARCH_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cache_headers)
+    
+    response.headers.update(cache_headers)
+    return [{"name": name, "popularity": count} for name, count in index.search(q, limit, rankings)]
+
 # Prediction endpoints
-@app.post("/api/v1/predictions/next-item", response_model=schemas.Prediction)
+def prediction_result(basket, top_items, top_probabilities):
+    return {
+        "basket": basket.items,
+        "predicted_items": [
+            {"item": item, "probability": prob} 
+            for item, prob in zip(top_items, top_probabilities)
+        ],
+        "timestamp": datetime.now()
+    }
+
+def log_prediction(db, current_user, basket, top_items, top_probabilities):
+    """Build the prediction response and record it in prediction_logs."""
+    result = prediction_result(basket, top_items, top_probabilities)
+    
+    # Log prediction to database (optional)
+    try:
+        with metrics.stage_timer("db_log"):
+            db_prediction = models.PredictionLog(
+                user_id=current_user.id,
+                input_data=basket.items,
+                output_data=top_items,
+                probabilities=[float(p) for p in top_probabilities],
+                timestamp=datetime.now()
+            )
+            db.add(db_prediction)
+            # Read the id before commit expires the instance (avoids a refresh SELECT)
+            db.flush()
+            result["id"] = db_prediction.id
+            db.commit()
+    except Exception as e:
+        logger.error(f"Error logging prediction to database: {str(e)}")
+        # Don't fail the request if DB logging fails
+    
+    return result
+
+def popularity_fallback(index, basket_items, k=5):
+    """Most purchased items not already in the basket, for degraded responses.
+
+    Items never purchased are left out, so without popularity data this is empty.
+    """
+    in_basket = set(basket_items)
+    ranked = [
+        (name, count)
+        for name, count in index.most_popular(k + len(in_basket))
+        if name not in in_basket and count > 0
+    ][:k]
+    total = sum(count for _, count in ranked) or 1
+    return [name for name, _ in ranked], [count / total * 100 for _, count in ranked]
+
+async def degraded_prediction(request: Request):
+    """Cheap answer for a request over capacity, without the model, the DB or the threadpool.
+
+    The token's signature is checked but not the user row, since that would
+    need a DB session; the answer holds nothing user-specific. With neither a
+    materialized answer nor popularity data there is nothing honest to return,
+    so the request is shed instead.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]) if scheme.lower() == "bearer" else {}
+    except jwt.PyJWTError:
+        payload = {}
+    if payload.get("sub") is None:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content={"detail": "Could not validate credentials"},
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    
+    try:
+        basket = schemas.Basket(**await request.json())
+    except (TypeError, ValueError):
+        return JSONResponse(status_code=422, content={"detail": "Invalid basket"})
+    
+    snapshot = prediction_model.snapshot
+    cached = popular_table.lookup(basket.items, snapshot.version)
+    if cached is not None:
+        top_items = [entry["item"] for entry in cached]
+        top_probabilities = [entry["probability"] for entry in cached]
+    else:
+        top_items, top_probabilities = popularity_fallback(snapshot.item_index, basket.items)
+        if not top_items:
+            return shed_response()
+    metrics.ADMISSION.labels("degraded").inc()
+    result = prediction_result(basket, top_items, top_probabilities)
+    return JSONResponse(content=jsonable_encoder(result))
+
+@app.post(PREDICTION_PATH, response_model=schemas.Prediction)
 def predict_next_item(
     basket: schemas.Basket,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    current_user: models.User = Depends(get_prediction_user)
 ):
+    prediction_model.refresh_if_stale()
+    # Read once: every stage below uses the same model version
+    snapshot = prediction_model.snapshot
+
     # First, check if model components are loaded
-    if prediction_model.model is None or prediction_model.mlb is None or prediction_model.unique_items is None:
+    if not snapshot.ready:
         logger.error("Prediction model components not loaded correctly")
         raise HTTPException(status_code=500, detail="Model components not available")
     
+    # Set by the admission control middleware
+    deadline = getattr(request.state, "deadline", None)
+    
+    # Hot path: format log messages only when their level is enabled
+    debug = logger.isEnabledFor(logging.DEBUG)
     try:
+        # Sampled before the cache lookup so the candidate sees all traffic, not just misses
+        shadowed = shadow_evaluator is not None and shadow_evaluator.sample()
+        primary_start = time.perf_counter()
+        
+        # Answer frequent baskets from the materialized table before touching the model
+        cached = popular_table.lookup(basket.items, snapshot.version)
+        metrics.POPULAR_LOOKUPS.labels("hit" if cached is not None else "miss").inc()
+        if cached is not None:
+            top_items = [entry["item"] for entry in cached]
+            top_probabilities = [entry["probability"] for entry in cached]
+            if shadowed:
+                shadow_evaluator.submit(
+                    current_user.id, basket.items, snapshot.version, top_items,
+                    (time.perf_counter() - primary_start) * 1000
+                )
+            return log_prediction(db, current_user, basket, top_items, top_probabilities)
+        
+        if deadline is not None and time.monotonic() > deadline:
+            raise HTTPException(
+                status_code=ADMISSION_SHED_STATUS,
+                detail="Request deadline exceeded",
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)}
+            )
+        
         # Log input data for debugging
-        logger.info(f"Received basket items: {basket.items}")
+        if debug:
+            logger.debug("Received basket items: %s", basket.items)
         
         # Validate input items against known items
-        unknown_items = [item for item in basket.items if item not in prediction_model.unique_items]
-        if unknown_items:
-            logger.warning(f"Unknown items in basket: {unknown_items}")
+        if logger.isEnabledFor(logging.WARNING):
+            unknown_items = [item for item in basket.items if item not in snapshot.unique_items]
+            if unknown_items:
+                logger.warning("Unknown items in basket: %s", unknown_items)
         
         # Transform items using the MultiLabelBinarizer
         try:
-            basket_encoded = prediction_model.mlb.transform([basket.items])
-            logger.debug(f"Successfully encoded basket: shape {basket_encoded.shape}")
+            with metrics.stage_timer("encode"):
+                basket_encoded = snapshot.mlb.transform([basket.items])
+            if debug:
+                logger.debug("Successfully encoded basket: shape %s", basket_encoded.shape)
         except Exception as e:
             logger.error(f"Error encoding basket items: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error encoding items: {str(e)}")
         
         # Make prediction
         try:
-            prediction = prediction_model.model.predict(basket_encoded)
-            logger.debug(f"Prediction made successfully: shape {prediction.shape}")
+            with metrics.stage_timer("forward"):
+                prediction = snapshot.model.predict(basket_encoded, verbose=0)
+            metrics.BATCH_SIZE.observe(basket_encoded.shape[0])
+            if debug:
+                logger.debug("Prediction made successfully: shape %s", prediction.shape)
         except Exception as e:
             logger.error(f"Error during model prediction: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
         
         # Get top 5 predicted items
         try:
-            top_indices = np.argsort(prediction[0])[-5:][::-1]
-            logger.debug(f"Top indices from prediction: {top_indices}")
-            
-            # Create a reverse mapping from index to item name
-            idx_to_item = {int(v): k for k, v in prediction_model.unique_items.items()}
-            logger.debug(f"Created reverse mapping with {len(idx_to_item)} items")
-            
-            # Map indices to item names using the reverse mapping
-            top_items = [idx_to_item.get(int(idx), f"Unknown-{idx}") for idx in top_indices]
-            top_probabilities = [float(prediction[0][idx]) * 100 for idx in top_indices]
+            with metrics.stage_timer("topk"):
+                top_indices = np.argsort(prediction[0])[-5:][::-1]
+                
+                # Map indices to item names using the reverse mapping built at load time
+                idx_to_item = snapshot.idx_to_item
+                top_items = [idx_to_item.get(int(idx), f"Unknown-{idx}") for idx in top_indices]
+                top_probabilities = [float(prediction[0][idx]) * 100 for idx in top_indices]
             
-            logger.debug(f"Top items: {top_items}")
-            logger.debug(f"Top probabilities: {top_probabilities}")
+            if debug:
+                logger.debug("Top items: %s", top_items)
+                logger.debug("Top probabilities: %s", top_probabilities)
         except Exception as e:
             logger.error(f"Error processing prediction results: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error processing results: {str(e)}")
         
-        # Create prediction result
-        result = {
-            "basket": basket.items,
-            "predicted_items": [
-                {"item": item, "probability": prob} 
-                for item, prob in zip(top_items, top_probabilities)
-            ],
-            "timestamp": datetime.now()
-        }
-        
-        # Log prediction to database (optional)
-        try:
-            db_prediction = models.PredictionLog(
-                user_id=current_user.id,
-                input_data=basket.items,
-                output_data=top_items,
-                probabilities=[float(p) for p in top_probabilities],
-                timestamp=datetime.now()
+        if shadowed:
+            shadow_evaluator.submit(
+                current_user.id, basket.items, snapshot.version, top_items,
+                (time.perf_counter() - primary_start) * 1000
             )
-            db.add(db_prediction)
-            db.commit()
-        except Exception as e:
-            logger.error(f"Error logging prediction to database: {str(e)}")
-            # Don't fail the request if DB logging fails
         
-        return result
+        # The client has given up; don't spend a commit on an answer nobody reads
+        if deadline is not None and time.monotonic() > deadline:
+            return prediction_result(basket, top_items, top_probabilities)
+        
+        return log_prediction(db, current_user, basket, top_items, top_probabilities)
     
+    except HTTPException:
+        raise
     except Exception as e:
         # Catch-all for any other exceptions
         logger.error(f"Unexpected error in prediction endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+@app.post("/api/v1/predictions/feedback", response_model=schemas.FeedbackReceipt, status_code=202)
+def submit_feedback_batch(
+    batch: schemas.FeedbackBatch,
+    current_user: models.User = Depends(get_current_user)
+):
+    # Applied asynchronously; feedback on other users' predictions is ignored at flush
+    feedback_buffer.add(
+        current_user.id,
+        [(event.prediction_id, event.accepted_item, event.signal) for event in batch.events]
+    )
+    return {"queued": len(batch.events)}
+
+@app.post("/api/v1/predictions/{prediction_id}/feedback", response_model=schemas.FeedbackReceipt, status_code=202)
+def submit_feedback(
+    prediction_id: int,
+    prediction_feedback: schemas.PredictionFeedback,
+    current_user: models.User = Depends(get_current_user)
+):
+    feedback_buffer.add(
+        current_user.id,
+        [(prediction_id, prediction_feedback.accepted_item, prediction_feedback.feedback)]
+    )
+    return {"queued": 1}
+
 # Model management endpoints (admin only)
 @app.post("/api/v1/models/deploy", response_model=schemas.ModelDeployment)
 def deploy_model(
@@ -330,11 +776,82 @@ def deploy_model(
     db.commit()
     db.refresh(db_deployment)
     
-    # In production, you would trigger model reloading here
-    # prediction_model.load_model()
+    # Reload the serving model; with SHARED_MODEL_DIR set this publishes the new
+    # weights once and every worker re-attaches on its next request
+    prediction_model.load_model()
     
     return db_deployment
 
+@app.get("/api/v1/models/shadow/report", response_model=schemas.ShadowReport)
+def read_shadow_report(
+    limit: int = Query(1000, ge=1, le=100000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    # Check if user has admin rights
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if shadow_evaluator is None:
+        raise HTTPException(status_code=404, detail="No shadow model configured")
+    
+    report = shadow_evaluator.report(db, limit=limit, purchase_window_days=SHADOW_PURCHASE_WINDOW_DAYS)
+    report["primary_version"] = prediction_model.version
+    return report
+
+@app.get("/api/v1/admin/prediction-rollups", response_model=List[schemas.PredictionRollup])
+def read_prediction_rollups(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    item: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    # Check if user has admin rights
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    query = db.query(models.PredictionRollup)
+    if start is not None:
+        query = query.filter(models.PredictionRollup.day >= start)
+    if end is not None:
+        query = query.filter(models.PredictionRollup.day < end)
+    if item is not None:
+        query = query.filter(models.PredictionRollup.item == item)
+    
+    return query.order_by(models.PredictionRollup.day.desc(), models.PredictionRollup.predictions.desc()).limit(limit).all()
+
+# Data export endpoints (admin only)
+@app.get("/api/v1/admin/export/{dataset}")
+def export_data(
+    dataset: str,
+    format: str = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: models.User = Depends(get_current_user)
+):
+    # Check if user has admin rights
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if dataset not in export.EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {dataset}")
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if format == "parquet" and not export.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+    
+    return StreamingResponse(
+        export.stream(SessionLocal, dataset, format, start, end),
+        media_type=export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    )
+
+# Metrics endpoint (Prometheus text format)
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 # Health check endpoint
 @app.get("/health")
 def health_check():
@@ -0,0 +1,123 @@
+"""Prometheus metrics for the API, served from /metrics.
+
+When running several uvicorn workers, point PROMETHEUS_MULTIPROC_DIR at an
+empty directory so every worker writes its samples there and /metrics
+aggregates them.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PREDICTION_STAGES = ("auth", "encode", "forward", "topk", "db_log")
+
+REQUESTS = Counter(
+    "smartbasket_http_requests_total",
+    "HTTP requests by route and response status",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "smartbasket_http_request_duration_seconds",
+    "End-to-end HTTP request latency",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "smartbasket_prediction_stage_duration_seconds",
+    "Time spent in each stage of the prediction pipeline",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+BATCH_SIZE = Histogram(
+    "smartbasket_prediction_batch_rows",
+    "Rows per model forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+POPULAR_LOOKUPS = Counter(
+    "smartbasket_popular_lookups_total",
+    "Prediction requests answered from (hit) or missing (miss) the popular-basket table",
+    ["result"],
+)
+POPULAR_ENTRIES = Gauge(
+    "smartbasket_popular_entries",
+    "Baskets in the in-memory popular-basket table",
+    multiprocess_mode="max",
+)
+ADMISSION = Counter(
+    "smartbasket_admission_total",
+    "Prediction requests by admission outcome (admitted, degraded, shed)",
+    ["outcome"],
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "smartbasket_admission_in_flight",
+    "Predictions currently holding an admission slot",
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "smartbasket_admission_queued",
+    "Predictions waiting for an admission slot",
+    multiprocess_mode="livesum",
+)
+FEEDBACK_EVENTS = Counter(
+    "smartbasket_feedback_events_total",
+    "Prediction feedback events by stage (buffered, applied, ignored, failed)",
+    ["stage"],
+)
+MODEL_INFO = Gauge(
+    "smartbasket_model_info",
+    "Version of the model currently being served",
+    ["version"],
+    multiprocess_mode="liveall",
+)
+MODEL_ITEMS = Gauge(
+    "smartbasket_model_items",
+    "Items in the served model's catalog",
+    multiprocess_mode="max",
+)
+
+# Resolve label children once so the hot path skips the label lookup
+_stage_histograms = {stage: STAGE_LATENCY.labels(stage) for stage in PREDICTION_STAGES}
+
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stage_histograms[stage].observe(time.perf_counter() - start)
+
+
+_served_version = None
+
+
+def set_model_info(version, item_count):
+    global _served_version
+    # Zero the old series rather than clearing it; multiprocess files keep it anyway
+    if _served_version is not None and _served_version != version:
+        MODEL_INFO.labels(_served_version).set(0)
+    if version is not None:
+        MODEL_INFO.labels(version).set(1)
+    _served_version = version
+    MODEL_ITEMS.set(item_count)
+
+
+def render():
+    """Return (body, content_type) for the /metrics endpoint."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Float, JSON, Table, Text
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Date, DateTime, Float, JSON, Table, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -58,4 +58,60 @@ class ModelDeployment(Base):
     deployed_by = Column(Integer, ForeignKey("users.id"))
     deployment_time = Column(DateTime)
     status = Column(String)  # "successful", "failed", etc.
-    metrics = Column(JSON)  # Model performance metrics
\ No newline at end of file
+    metrics = Column(JSON)  # Model performance metrics
+
+class PopularBasket(Base):
+    __tablename__ = "popular_baskets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    basket_key = Column(String, unique=True, index=True)  # Sorted, de-duplicated items joined by \x1f
+    items = Column(JSON)
+    count = Column(Integer, default=0, index=True)
+    model_version = Column(String, nullable=True)  # Version the predictions were computed with
+    predictions = Column(JSON, nullable=True)  # [{"item": ..., "probability": ...}, ...]
+    updated_at = Column(DateTime)
+
+class MaterializationState(Base):
+    __tablename__ = "materialization_state"
+
+    name = Column(String, primary_key=True)
+    last_transaction_id = Column(Integer, default=0)
+    last_prediction_log_id = Column(Integer, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+class ItemPopularity(Base):
+    __tablename__ = "item_popularity"
+
+    item = Column(String, primary_key=True)
+    transaction_count = Column(Integer, default=0)
+
+class PredictionRollup(Base):
+    __tablename__ = "prediction_rollups"
+
+    day = Column(Date, primary_key=True)
+    item = Column(String, primary_key=True)
+    predictions = Column(Integer, default=0)  # Predictions that recommended the item
+    feedback = Column(Integer, default=0)  # Of those, how many received feedback
+
+class ShadowEvaluation(Base):
+    __tablename__ = "shadow_evaluations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    timestamp = Column(DateTime, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    basket = Column(JSON)
+    primary_version = Column(String)
+    candidate_version = Column(String, index=True)
+    primary_items = Column(JSON)
+    candidate_items = Column(JSON)
+    primary_latency_ms = Column(Float)
+    candidate_latency_ms = Column(Float)
+
+class ItemFeedbackStats(Base):
+    __tablename__ = "item_feedback_stats"
+
+    item = Column(String, primary_key=True)
+    shown = Column(Integer, default=0)  # Predictions with feedback that recommended the item
+    accepted = Column(Integer, default=0)  # ...where the user accepted this item
+    rejected = Column(Integer, default=0)  # ...where the user rejected the prediction
+    updated_at = Column(DateTime, index=True)
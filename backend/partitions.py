@@ -0,0 +1,254 @@
+"""Time partitioning, retention and daily rollups for prediction_logs.
+
+On PostgreSQL prediction_logs is a RANGE-partitioned table on ``timestamp``
+with one partition per month, plus a default partition so inserts never fail
+if maintenance falls behind. Rows that land in the default partition are
+moved into their month's partition when maintenance creates it. Retention
+detaches and drops whole partitions. Other databases, such as SQLite in development and benchmarks,
+keep a single table and retention falls back to batched DELETEs.
+
+Rollups keep per-item/per-day prediction and feedback counts in
+prediction_rollups, which outlives the raw partitions. On PostgreSQL each day
+is aggregated in SQL, so raw rows never leave the database.
+"""
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import column, delete, func, inspect, select, table, text
+
+import models
+
+logger = logging.getLogger(__name__)
+
+TABLE = models.PredictionLog.__tablename__
+PARTITION_PREFIX = f"{TABLE}_"
+DEFAULT_PARTITION = f"{PARTITION_PREFIX}default"
+DELETE_BATCH = 10000
+
+
+def is_postgres(engine):
+    return engine.dialect.name == "postgresql"
+
+
+def _month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _is_partitioned(conn):
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table"
+    ), {"table": TABLE}).first() is not None
+
+
+def _month_partitions(today, months_ahead):
+    month = _month_start(today or date.today())
+    for _ in range(months_ahead + 1):
+        yield month
+        month = _next_month(month)
+
+
+def _create_partition(conn, month):
+    """Create the partition for month, moving any of its rows out of the default partition.
+
+    Creating a range partition fails while the default partition holds rows in
+    that range, so those rows are moved with the default partition detached.
+    Returns the number of rows moved.
+    """
+    name = f"{PARTITION_PREFIX}{month:%Y%m}"
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return 0
+    bounds = f"FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+    in_range = f"timestamp >= '{month.isoformat()}' AND timestamp < '{_next_month(month).isoformat()}'"
+
+    stranded = conn.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_range}")).scalar()
+    if not stranded:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}"))
+        return 0
+
+    logger.warning(f"Moving {stranded} prediction logs for {month:%Y-%m} out of {DEFAULT_PARTITION}")
+    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}"))
+    conn.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+    conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return stranded
+
+
+def create_all(engine, metadata, months_ahead=2, today=None):
+    """create_all, except prediction_logs is created partitioned on PostgreSQL.
+
+    The partitions for the current month and the next months_ahead are created
+    in the same transaction, so inserts land in them from the first request.
+    """
+    if not is_postgres(engine):
+        metadata.create_all(bind=engine)
+        return
+
+    metadata.create_all(bind=engine, tables=[t for t in metadata.sorted_tables if t.name != TABLE])
+    if inspect(engine).has_table(TABLE):
+        return  # Existing deployments keep their table until migrated by hand
+    with engine.begin() as conn:
+        # The partition key must be part of the primary key
+        conn.execute(text(f"""
+            CREATE TABLE {TABLE} (
+                id BIGSERIAL,
+                user_id INTEGER REFERENCES users (id),
+                timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                input_data JSON,
+                output_data JSON,
+                probabilities JSON,
+                feedback VARCHAR,
+                PRIMARY KEY (id, timestamp)
+            ) PARTITION BY RANGE (timestamp)
+        """))
+        conn.execute(text(f"CREATE INDEX ix_{TABLE}_id ON {TABLE} (id)"))
+        conn.execute(text(f"CREATE INDEX ix_{TABLE}_timestamp ON {TABLE} (timestamp)"))
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+        for month in _month_partitions(today, months_ahead):
+            _create_partition(conn, month)
+    logger.info(f"Created partitioned table {TABLE}")
+
+
+def ensure_partitions(engine, months_ahead=2, today=None):
+    """Create monthly partitions from the current month through months_ahead.
+
+    Months that already have rows in the default partition (e.g. because
+    maintenance was down across a month boundary) get their partition too,
+    and the rows are moved into it.
+    """
+    if not is_postgres(engine):
+        return
+    with engine.begin() as conn:
+        if not _is_partitioned(conn):
+            return
+        months = set(_month_partitions(today, months_ahead))
+        months.update(conn.execute(text(
+            f"SELECT DISTINCT date_trunc('month', timestamp)::date FROM {DEFAULT_PARTITION}"
+        )).scalars())
+    # One transaction per month keeps each detach of the default partition short
+    for month in sorted(months):
+        with engine.begin() as conn:
+            _create_partition(conn, month)
+
+
+def _delete_before(engine, log, cutoff):
+    """Delete rows older than cutoff in batches to keep transactions short."""
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            ids = select(log.c.id).where(log.c.timestamp < cutoff).limit(DELETE_BATCH).scalar_subquery()
+            count = conn.execute(delete(log).where(log.c.id.in_(ids))).rowcount
+        deleted += count
+        if count < DELETE_BATCH:
+            return deleted
+
+
+def drop_expired(engine, retention_days, today=None):
+    """Remove prediction logs older than retention_days; returns what was dropped."""
+    cutoff = (today or date.today()) - timedelta(days=retention_days)
+    cutoff_time = datetime.combine(cutoff, datetime.min.time())
+
+    if is_postgres(engine):
+        with engine.connect() as conn:
+            partitioned = _is_partitioned(conn)
+            partitions = conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table"
+            ), {"table": TABLE}).scalars().all()
+        if partitioned:
+            dropped = []
+            for name in partitions:
+                suffix = name[len(PARTITION_PREFIX):]
+                if not suffix.isdigit():
+                    continue  # the default partition
+                upper = _next_month(datetime.strptime(suffix, "%Y%m").date())
+                if upper <= cutoff:
+                    with engine.begin() as conn:
+                        conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+                        conn.execute(text(f"DROP TABLE {name}"))
+                    dropped.append(name)
+            if dropped:
+                logger.info(f"Dropped expired partitions: {', '.join(dropped)}")
+
+            # Rows that ensure_partitions hasn't moved out of the default partition yet
+            default = table(DEFAULT_PARTITION, column("id"), column("timestamp"))
+            deleted = _delete_before(engine, default, cutoff_time)
+            if deleted:
+                logger.warning(f"Deleted {deleted} expired prediction logs from {DEFAULT_PARTITION}")
+            return dropped
+
+    deleted = _delete_before(engine, models.PredictionLog.__table__, cutoff_time)
+    if deleted:
+        logger.info(f"Deleted {deleted} expired prediction logs")
+    return deleted
+
+
+def _day_counts(db, start):
+    """Return (predictions, feedback) Counters per item for the day starting at start."""
+    end = start + timedelta(days=1)
+    predictions = Counter()
+    feedback = Counter()
+    if is_postgres(db.get_bind()):
+        # Aggregated in the database so only one row per item comes back; a missing
+        # output is stored as JSON null, which json_array_elements_text rejects
+        rows = db.execute(text(
+            f"SELECT item, count(*), count(feedback) FROM {TABLE}, json_array_elements_text("
+            f"CASE WHEN json_typeof(output_data) = 'array' THEN output_data END) AS item "
+            f"WHERE timestamp >= :start AND timestamp < :end GROUP BY item"
+        ), {"start": start, "end": end})
+        for item, predicted, with_feedback in rows:
+            predictions[item] = predicted
+            if with_feedback:
+                feedback[item] = with_feedback
+        return predictions, feedback
+
+    rows = db.execute(
+        select(models.PredictionLog.output_data, models.PredictionLog.feedback)
+        .where(models.PredictionLog.timestamp >= start)
+        .where(models.PredictionLog.timestamp < end)
+        .execution_options(yield_per=1000)
+    )
+    for output_data, has_feedback in rows:
+        for item in output_data or []:
+            predictions[item] += 1
+            if has_feedback is not None:
+                feedback[item] += 1
+    return predictions, feedback
+
+
+def rollup(db, lookback_days=2, today=None):
+    """Recompute per-item daily counts for days not rolled up yet.
+
+    The last lookback_days are always recomputed so late feedback is counted.
+    """
+    today = today or date.today()
+    last_day = db.query(func.max(models.PredictionRollup.day)).scalar()
+    if last_day is None:
+        first_logged = db.query(func.min(models.PredictionLog.timestamp)).scalar()
+        if first_logged is None:
+            return 0
+        day = first_logged.date()
+    else:
+        day = min(last_day, today - timedelta(days=lookback_days))
+
+    days = 0
+    while day <= today:
+        predictions, feedback = _day_counts(db, datetime.combine(day, datetime.min.time()))
+        if predictions:
+            # Days whose logs are gone (e.g. past retention) keep their existing rollups
+            db.execute(delete(models.PredictionRollup).where(models.PredictionRollup.day == day))
+        db.add_all(
+            models.PredictionRollup(day=day, item=item, predictions=count, feedback=feedback[item])
+            for item, count in predictions.items()
+        )
+        db.commit()
+        day += timedelta(days=1)
+        days += 1
+    return days
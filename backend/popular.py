@@ -0,0 +1,212 @@
+"""Materialized "popular after X" predictions.
+
+A background job counts the starting baskets seen in Transaction (every prefix
+of up to MAX_BASKET_ITEMS items) and PredictionLog (the requested basket),
+incrementally from a stored watermark. The most frequent baskets get their
+top-k predictions computed with the serving model and stored next to the
+model version they came from, so a new deployment recomputes them. Each
+worker keeps the table in memory and answers matching baskets from it before
+touching the model.
+"""
+import logging
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import or_, select
+
+import models
+
+logger = logging.getLogger(__name__)
+
+STATE_NAME = "popular_baskets"
+KEY_SEPARATOR = "\x1f"
+IN_CHUNK = 500
+SCORE_CHUNK = 256  # baskets per forward pass when recomputing predictions
+
+
+def basket_key(items):
+    # The model sees the basket as a multi-hot set, so order and repeats don't matter
+    return KEY_SEPARATOR.join(sorted(set(items)))
+
+
+def _count_new_baskets(db, state, max_items):
+    """Count baskets (and, from transactions, single items) past the watermarks."""
+    counts = Counter()
+    item_counts = Counter()
+    last_transaction_id = state.last_transaction_id or 0
+    rows = db.execute(
+        select(models.Transaction.id, models.Transaction.items)
+        .where(models.Transaction.id > last_transaction_id)
+        .order_by(models.Transaction.id)
+        .execution_options(yield_per=1000)
+    )
+    for transaction_id, items in rows:
+        for n in range(1, min(len(items or []), max_items) + 1):
+            counts[basket_key(items[:n])] += 1
+        item_counts.update(set(items or []))
+        last_transaction_id = transaction_id
+
+    last_prediction_log_id = state.last_prediction_log_id or 0
+    rows = db.execute(
+        select(models.PredictionLog.id, models.PredictionLog.input_data)
+        .where(models.PredictionLog.id > last_prediction_log_id)
+        .order_by(models.PredictionLog.id)
+        .execution_options(yield_per=1000)
+    )
+    for log_id, items in rows:
+        if items and len(set(items)) <= max_items:
+            counts[basket_key(items)] += 1
+        last_prediction_log_id = log_id
+
+    state.last_transaction_id = last_transaction_id
+    state.last_prediction_log_id = last_prediction_log_id
+    return counts, item_counts
+
+
+def _merge_counts(db, counts, now):
+    keys = list(counts)
+    for start in range(0, len(keys), IN_CHUNK):
+        chunk = keys[start:start + IN_CHUNK]
+        existing = {
+            row.basket_key: row
+            for row in db.query(models.PopularBasket).filter(models.PopularBasket.basket_key.in_(chunk))
+        }
+        for key in chunk:
+            row = existing.get(key)
+            if row is None:
+                db.add(models.PopularBasket(
+                    basket_key=key,
+                    items=key.split(KEY_SEPARATOR),
+                    count=counts[key],
+                    updated_at=now,
+                ))
+            else:
+                row.count += counts[key]
+                row.updated_at = now
+
+
+def _merge_item_counts(db, item_counts):
+    items = list(item_counts)
+    for start in range(0, len(items), IN_CHUNK):
+        chunk = items[start:start + IN_CHUNK]
+        existing = {
+            row.item: row
+            for row in db.query(models.ItemPopularity).filter(models.ItemPopularity.item.in_(chunk))
+        }
+        for item in chunk:
+            row = existing.get(item)
+            if row is None:
+                db.add(models.ItemPopularity(item=item, transaction_count=item_counts[item]))
+            else:
+                row.transaction_count += item_counts[item]
+
+
+def item_popularity(db):
+    """Return {item: number of transactions containing it}."""
+    return dict(db.query(models.ItemPopularity.item, models.ItemPopularity.transaction_count))
+
+
+def _lock_state(db):
+    """Lock the state row, or return None if another host holds it (or it doesn't exist)."""
+    return db.execute(
+        select(models.MaterializationState)
+        .where(models.MaterializationState.name == STATE_NAME)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+
+
+def refresh(db, prediction_model, top_n, max_items, k=5, chunk_size=SCORE_CHUNK):
+    """Fold new history into the counts and (re)compute stale top-n predictions.
+
+    Item popularity counts for search ranking are folded in on the same pass.
+    Returns True if the table changed. The state row is locked while counting
+    and while scoring each chunk, so concurrent refreshers on other hosts skip
+    instead of double counting. Stale baskets are scored chunk_size at a time,
+    committing after each chunk, so a new model version never encodes the
+    whole top-n in one forward pass.
+    """
+    if prediction_model.model is None or prediction_model.version is None:
+        return False
+
+    state = _lock_state(db)
+    if state is None:
+        if db.get(models.MaterializationState, STATE_NAME) is not None:
+            return False  # Another host holds the lock
+        state = models.MaterializationState(name=STATE_NAME, last_transaction_id=0, last_prediction_log_id=0)
+        db.add(state)
+
+    now = datetime.now()
+    counts, item_counts = _count_new_baskets(db, state, max_items)
+    _merge_counts(db, counts, now)
+    _merge_item_counts(db, item_counts)
+    if counts:
+        state.updated_at = now
+    db.commit()
+
+    top = select(models.PopularBasket.id).order_by(models.PopularBasket.count.desc()).limit(top_n)
+    recomputed = 0
+    while _lock_state(db) is not None:
+        stale = (
+            db.query(models.PopularBasket)
+            .filter(
+                models.PopularBasket.id.in_(top),
+                or_(
+                    models.PopularBasket.model_version.is_(None),
+                    models.PopularBasket.model_version != prediction_model.version,
+                ),
+            )
+            .limit(chunk_size)
+            .all()
+        )
+        if not stale:
+            db.rollback()
+            break
+        now = datetime.now()
+        predictions = prediction_model.predict_top_k([row.items for row in stale], k)
+        for row, predicted in zip(stale, predictions):
+            row.predictions = [{"item": item, "probability": prob} for item, prob in predicted]
+            row.model_version = prediction_model.version
+            row.updated_at = now
+        db.get(models.MaterializationState, STATE_NAME).updated_at = now
+        db.commit()
+        recomputed += len(stale)
+
+    changed = bool(counts) or bool(recomputed)
+    if changed:
+        logger.info(f"Popular baskets refreshed: {len(counts)} baskets counted, {recomputed} predictions recomputed")
+    return changed
+
+
+class PopularTable:
+    """In-memory lookup of precomputed predictions for the current model version."""
+
+    def __init__(self):
+        self.version = None
+        self.entries = {}
+        self.loaded_at = None
+
+    def load(self, db, model_version, top_n):
+        rows = (
+            db.query(models.PopularBasket.basket_key, models.PopularBasket.predictions)
+            .filter(models.PopularBasket.model_version == model_version)
+            .order_by(models.PopularBasket.count.desc())
+            .limit(top_n)
+        )
+        entries = {key: predictions for key, predictions in rows if predictions}
+        # Swap whole references so request threads never see a half-built table
+        self.entries = entries
+        self.version = model_version
+        self.loaded_at = datetime.now()
+
+    def is_stale(self, db, model_version):
+        if self.version != model_version or self.loaded_at is None:
+            return True
+        updated_at = db.query(models.MaterializationState.updated_at).filter(
+            models.MaterializationState.name == STATE_NAME
+        ).scalar()
+        return updated_at is not None and updated_at > self.loaded_at
+
+    def lookup(self, items, model_version):
+        if self.version != model_version:
+            return None
+        return self.entries.get(basket_key(items))
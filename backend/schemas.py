@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, conlist
+from typing import List, Literal, Optional, Dict, Any
+from datetime import date, datetime
 
 # User schemas
 class UserBase(BaseModel):
@@ -48,6 +48,7 @@ class PredictionItem(BaseModel):
     probability: float
 
 class Prediction(BaseModel):
+    id: Optional[int] = None  # PredictionLog id to send feedback against
     basket: List[str]
     predicted_items: List[PredictionItem]
     timestamp: datetime
@@ -64,6 +65,52 @@ class PredictionLog(BaseModel):
     class Config:
         orm_mode = True
 
+class PredictionRollup(BaseModel):
+    day: date
+    item: str
+    predictions: int
+    feedback: int
+
+    class Config:
+        orm_mode = True
+
+class LatencySummary(BaseModel):
+    p50: float
+    p95: float
+    p99: float
+
+class ShadowReport(BaseModel):
+    primary_version: Optional[str] = None
+    candidate_version: Optional[str] = None
+    sample_rate: float
+    samples: int
+    dropped: int
+    primary_latency_ms: LatencySummary
+    candidate_latency_ms: LatencySummary
+    top1_agreement: float
+    topk_overlap: float
+    purchases_evaluated: int
+    primary_purchase_hit_rate: float
+    candidate_purchase_hit_rate: float
+
+# Feedback schemas
+FeedbackSignal = Literal["accepted", "rejected", "ignored"]
+
+class PredictionFeedback(BaseModel):
+    feedback: FeedbackSignal
+    accepted_item: Optional[str] = None
+
+class FeedbackEvent(BaseModel):
+    prediction_id: int
+    accepted_item: Optional[str] = None
+    signal: FeedbackSignal
+
+class FeedbackBatch(BaseModel):
+    events: conlist(FeedbackEvent, min_items=1, max_items=1000)
+
+class FeedbackReceipt(BaseModel):
+    queued: int
+
 # Item schemas
 class ItemBase(BaseModel):
     name: str
@@ -80,6 +127,10 @@ class Item(ItemBase):
     class Config:
         orm_mode = True
 
+class ItemSearchResult(BaseModel):
+    name: str
+    popularity: int
+
 # Model management schemas
 class ModelDeploymentCreate(BaseModel):
     model_version: str
@@ -0,0 +1,151 @@
+"""Shadow evaluation of a candidate model against live traffic.
+
+A sampled share of live baskets is re-scored by a candidate model on a single
+background thread, after the primary's response has been produced. The queue
+is bounded and overflow is dropped rather than delayed, so the primary's
+latency never waits on the candidate. Each comparison is stored in
+shadow_evaluations; the report aggregates latency, agreement with the primary
+and hit rates against the user's later purchases in Transaction.
+"""
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import models
+
+logger = logging.getLogger(__name__)
+
+
+def _latency_summary(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+class ShadowEvaluator:
+    def __init__(self, candidate, session_factory, sample_rate, max_pending=64, k=5):
+        self.candidate = candidate
+        self.session_factory = session_factory
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.k = k
+        self.pending = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+
+    def sample(self):
+        """Decide whether a request is shadowed, before the primary answers it."""
+        return random.random() < self.sample_rate
+
+    def submit(self, user_id, basket_items, primary_version, primary_items, primary_latency_ms):
+        """Queue a comparison for a sampled request; never blocks the caller."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return
+            self.pending += 1
+        self._executor.submit(
+            self._evaluate, user_id, list(basket_items), primary_version, list(primary_items), primary_latency_ms
+        )
+
+    def _evaluate(self, user_id, basket_items, primary_version, primary_items, primary_latency_ms):
+        try:
+            start = time.perf_counter()
+            predicted = self.candidate.predict_top_k([basket_items], self.k)[0]
+            candidate_latency_ms = (time.perf_counter() - start) * 1000
+
+            db = self.session_factory()
+            try:
+                db.add(models.ShadowEvaluation(
+                    timestamp=datetime.now(),
+                    user_id=user_id,
+                    basket=basket_items,
+                    primary_version=primary_version,
+                    candidate_version=self.candidate.version,
+                    primary_items=primary_items,
+                    candidate_items=[item for item, _ in predicted],
+                    primary_latency_ms=primary_latency_ms,
+                    candidate_latency_ms=candidate_latency_ms,
+                ))
+                db.commit()
+            finally:
+                db.close()
+        except Exception as e:
+            logger.error(f"Shadow evaluation failed: {str(e)}")
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def _recent(self, db, limit, until=None):
+        query = db.query(models.ShadowEvaluation).filter(
+            models.ShadowEvaluation.candidate_version == self.candidate.version
+        )
+        if until is not None:
+            query = query.filter(models.ShadowEvaluation.timestamp <= until)
+        return query.order_by(models.ShadowEvaluation.id.desc()).limit(limit).all()
+
+    def report(self, db, limit=1000, purchase_window_days=7, now=None):
+        """Compare the candidate with the primary over its most recent evaluations.
+
+        Hit rates use the most recent limit evaluations whose purchase window
+        has closed, queried separately so a burst of new samples can't hide them.
+        """
+        rows = self._recent(db, limit)
+        report = {
+            "candidate_version": self.candidate.version,
+            "sample_rate": self.sample_rate,
+            "samples": len(rows),
+            "dropped": self.dropped,
+            "primary_latency_ms": _latency_summary([row.primary_latency_ms for row in rows]),
+            "candidate_latency_ms": _latency_summary([row.candidate_latency_ms for row in rows]),
+            "top1_agreement": 0.0,
+            "topk_overlap": 0.0,
+            "purchases_evaluated": 0,
+            "primary_purchase_hit_rate": 0.0,
+            "candidate_purchase_hit_rate": 0.0,
+        }
+        if not rows:
+            return report
+
+        top1 = sum(1 for row in rows if row.primary_items[:1] == row.candidate_items[:1])
+        overlap = sum(len(set(row.primary_items) & set(row.candidate_items)) / self.k for row in rows)
+        report["top1_agreement"] = top1 / len(rows)
+        report["topk_overlap"] = overlap / len(rows)
+
+        # Later purchases: the user's transactions within the window after each prediction
+        window = timedelta(days=purchase_window_days)
+        closed = self._recent(db, limit, until=(now or datetime.now()) - window)
+        if not closed:
+            return report
+        purchases = defaultdict(list)
+        transactions = db.query(models.Transaction.user_id, models.Transaction.date, models.Transaction.items).filter(
+            models.Transaction.user_id.in_({row.user_id for row in closed}),
+            models.Transaction.date >= min(row.timestamp for row in closed),
+            models.Transaction.date <= max(row.timestamp for row in closed) + window,
+        )
+        for user_id, purchased_at, items in transactions:
+            purchases[user_id].append((purchased_at, set(items or [])))
+
+        evaluated = primary_hits = candidate_hits = 0
+        for row in closed:
+            bought = set()
+            for purchased_at, items in purchases[row.user_id]:
+                if row.timestamp <= purchased_at <= row.timestamp + window:
+                    bought |= items
+            bought -= set(row.basket)
+            evaluated += 1
+            primary_hits += bool(bought & set(row.primary_items))
+            candidate_hits += bool(bought & set(row.candidate_items))
+        if evaluated:
+            report["purchases_evaluated"] = evaluated
+            report["primary_purchase_hit_rate"] = primary_hits / evaluated
+            report["candidate_purchase_hit_rate"] = candidate_hits / evaluated
+        return report
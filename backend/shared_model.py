@@ -0,0 +1,182 @@
+"""Shared-memory model weights for multi-worker serving.
+
+One worker publishes the dense weights of the Keras model, the encoder classes
+and the item labels as plain ``.npy`` files under ``SHARED_MODEL_DIR`` (a tmpfs
+such as ``/dev/shm`` keeps them in RAM). Every worker then maps those files
+read-only with ``np.load(mmap_mode="r")`` so the kernel holds a single copy of
+the pages however many workers are attached, and the forward pass runs in numpy
+without each process loading its own TensorFlow graph.
+"""
+import fcntl
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+POINTER_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+MANIFEST_FILE = "manifest.json"
+
+
+class SharedModelError(Exception):
+    pass
+
+
+def _relu(x):
+    return np.maximum(x, 0)
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def _linear(x):
+    return x
+
+ACTIVATIONS = {
+    "relu": _relu,
+    "softmax": _softmax,
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+    "linear": _linear,
+}
+
+# Layers that are the identity at inference time
+PASSTHROUGH_LAYERS = ("InputLayer", "Dropout")
+
+
+@contextmanager
+def publish_lock(shared_dir):
+    """Serialize publishing across worker processes with an advisory file lock."""
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(os.path.join(shared_dir, LOCK_FILE), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def current_version(shared_dir):
+    """Return the version CURRENT points at, or None if nothing is published."""
+    try:
+        with open(os.path.join(shared_dir, POINTER_FILE), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _dense_layers(model):
+    layers = []
+    for layer in model.layers:
+        kind = layer.__class__.__name__
+        if kind in PASSTHROUGH_LAYERS:
+            continue
+        if kind != "Dense":
+            raise SharedModelError(f"Unsupported layer for shared serving: {kind}")
+        activation = layer.get_config()["activation"]
+        if activation not in ACTIVATIONS:
+            raise SharedModelError(f"Unsupported activation for shared serving: {activation}")
+        kernel, bias = layer.get_weights()
+        layers.append((kernel.astype(np.float32), bias.astype(np.float32), activation))
+    return layers
+
+
+def publish(model, mlb, unique_items, version, shared_dir):
+    """Write a new version into shared_dir and point CURRENT at it.
+
+    Callers must hold publish_lock. Files of older versions are unlinked; workers
+    that still map them keep their pages until they re-attach.
+    """
+    layers = _dense_layers(model)
+
+    labels = [""] * len(unique_items)
+    for item, idx in unique_items.items():
+        labels[int(idx)] = item
+
+    version_dir = os.path.join(shared_dir, version)
+    tmp_dir = f"{version_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    for i, (kernel, bias, _) in enumerate(layers):
+        np.save(os.path.join(tmp_dir, f"layer{i}_kernel.npy"), kernel)
+        np.save(os.path.join(tmp_dir, f"layer{i}_bias.npy"), bias)
+    np.save(os.path.join(tmp_dir, "classes.npy"), np.asarray(mlb.classes_, dtype=str))
+    np.save(os.path.join(tmp_dir, "labels.npy"), np.asarray(labels, dtype=str))
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump({"version": version, "activations": [a for _, _, a in layers]}, f)
+
+    shutil.rmtree(version_dir, ignore_errors=True)
+    os.rename(tmp_dir, version_dir)
+
+    pointer_tmp = os.path.join(shared_dir, f"{POINTER_FILE}.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(shared_dir, POINTER_FILE))
+    logger.info(f"Published model version {version} to {shared_dir}")
+
+    for entry in os.listdir(shared_dir):
+        path = os.path.join(shared_dir, entry)
+        if entry != version and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class SharedEncoder:
+    """The part of MultiLabelBinarizer used at serving time, over mapped classes."""
+
+    def __init__(self, classes):
+        self.classes_ = classes
+        self._index = {str(c): i for i, c in enumerate(classes)}
+
+    def transform(self, baskets):
+        encoded = np.zeros((len(baskets), len(self.classes_)), dtype=np.float32)
+        for row, items in enumerate(baskets):
+            for item in items:
+                col = self._index.get(item)
+                if col is not None:
+                    encoded[row, col] = 1.0
+        return encoded
+
+
+class SharedModel:
+    """Numpy forward pass over read-only memory-mapped dense weights."""
+
+    def __init__(self, version_dir):
+        with open(os.path.join(version_dir, MANIFEST_FILE), "r") as f:
+            manifest = json.load(f)
+        self.version = manifest["version"]
+        self.layers = [
+            (
+                np.load(os.path.join(version_dir, f"layer{i}_kernel.npy"), mmap_mode="r"),
+                np.load(os.path.join(version_dir, f"layer{i}_bias.npy"), mmap_mode="r"),
+                ACTIVATIONS[activation],
+            )
+            for i, activation in enumerate(manifest["activations"])
+        ]
+
+    def predict(self, x, verbose=0):
+        out = np.asarray(x, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            out = activation(out @ kernel + bias)
+        return out
+
+
+def attach(shared_dir):
+    """Map the published version; returns (version, model, encoder, unique_items)."""
+    version = current_version(shared_dir)
+    if version is None:
+        raise SharedModelError(f"No model has been published to {shared_dir}")
+    version_dir = os.path.join(shared_dir, version)
+    model = SharedModel(version_dir)
+    classes = np.load(os.path.join(version_dir, "classes.npy"), mmap_mode="r")
+    labels = np.load(os.path.join(version_dir, "labels.npy"), mmap_mode="r")
+    unique_items = {str(item): idx for idx, item in enumerate(labels)}
+    return version, model, SharedEncoder(classes), unique_items
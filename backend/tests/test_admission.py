@@ -0,0 +1,65 @@
+import asyncio
+
+import admission
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_parse_timeout():
+    assert admission.parse_timeout("1.5") == 1.5
+    assert admission.parse_timeout(None) is None
+    assert admission.parse_timeout("soon") is None
+    assert admission.parse_timeout("0") is None
+    assert admission.parse_timeout("-3") is None
+
+
+def test_free_slots_admit_without_queueing():
+    async def scenario():
+        controller = admission.AdmissionController(max_concurrency=2, max_queue=0, max_wait=1)
+        assert await controller.admit()
+        assert await controller.admit()
+        assert controller.in_flight == 2
+        # Queue size 0: a third request is shed at once
+        assert not await controller.admit()
+        controller.release()
+        controller.release()
+        assert controller.in_flight == 0
+
+    run(scenario())
+
+
+def test_queued_request_gets_a_released_slot():
+    async def scenario():
+        controller = admission.AdmissionController(max_concurrency=1, max_queue=1, max_wait=5)
+        assert await controller.admit()
+        waiter = asyncio.create_task(controller.admit())
+        await asyncio.sleep(0)
+        assert controller.queued == 1
+        # The queue is full, so the next request is shed without waiting
+        assert not await controller.admit()
+
+        controller.release()
+        assert await waiter
+        assert controller.queued == 0
+        assert controller.in_flight == 1
+
+    run(scenario())
+
+
+def test_wait_is_bounded_by_the_client_timeout():
+    async def scenario():
+        controller = admission.AdmissionController(max_concurrency=1, max_queue=4, max_wait=5)
+        assert await controller.admit()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert not await controller.admit(timeout=0.05)
+        assert loop.time() - start < 1
+        assert controller.queued == 0
+
+        # The timed-out waiter must not have consumed the slot
+        controller.release()
+        assert await controller.admit(timeout=0.05)
+
+    run(scenario())
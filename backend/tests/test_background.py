@@ -0,0 +1,35 @@
+import threading
+
+import background
+
+
+def test_periodic_job_runs_early_when_woken():
+    wake = threading.Event()
+    runs = []
+    ran = threading.Event()
+
+    def fn():
+        runs.append(1)
+        ran.set()
+
+    job = background.PeriodicJob("test", 60, fn, wake=wake)
+    job.start()
+    try:
+        assert ran.wait(5)
+        ran.clear()
+        wake.set()
+        assert ran.wait(5)
+        assert len(runs) == 2
+    finally:
+        job.stop()
+        job._thread.join(5)
+    assert not job._thread.is_alive()
+
+
+def test_leader_lock_is_exclusive(tmp_path, monkeypatch):
+    monkeypatch.setattr(background, "JOB_LOCK_DIR", str(tmp_path))
+    with background.leader_lock("job") as first:
+        with background.leader_lock("job") as second:
+            assert first and not second
+    with background.leader_lock("job") as again:
+        assert again
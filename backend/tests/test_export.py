@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import export
+import models
+
+TRANSACTIONS = [
+    (datetime(2024, 1, 1, 9), ["milk", "bread"]),
+    (datetime(2024, 1, 15, 12), ["eggs"]),
+    (datetime(2024, 2, 1, 8), ["yogurt", "butter", "milk"]),
+    (datetime(2024, 2, 20, 18), []),
+    (datetime(2024, 3, 5, 7), ["coffee"]),
+]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(models.User(id=1, username="ann"))
+        db.add_all(models.Transaction(user_id=1, date=date, items=items) for date, items in TRANSACTIONS)
+        db.add(models.PredictionLog(
+            user_id=1, timestamp=datetime(2024, 1, 2), input_data=["milk"], output_data=["bread", "eggs"],
+            probabilities=[40.5, 20.25], feedback="accepted:bread",
+        ))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def body(session_factory, dataset, fmt, **kwargs):
+    return b"".join(export.stream(session_factory, dataset, fmt, **kwargs))
+
+
+def test_iter_chunks_holds_chunk_rows_at_a_time(session_factory):
+    chunks = list(export.iter_chunks(session_factory, "transactions", chunk_rows=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [row[0] for chunk in chunks for row in chunk] == [1, 2, 3, 4, 5]
+
+
+def test_ndjson_round_trips(session_factory):
+    lines = body(session_factory, "transactions", "ndjson", chunk_rows=2).decode().splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert [row["items"] for row in rows] == [items for _, items in TRANSACTIONS]
+    assert rows[0] == {"id": 1, "user_id": 1, "date": "2024-01-01T09:00:00", "items": ["milk", "bread"]}
+
+
+def test_csv_writes_header_once_and_lists_as_json(session_factory):
+    text = body(session_factory, "predictions", "csv").decode()
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == list(export.EXPORTS["predictions"][2])
+    assert len(rows) == 2
+    record = dict(zip(rows[0], rows[1]))
+    assert json.loads(record["output_data"]) == ["bread", "eggs"]
+    assert json.loads(record["probabilities"]) == [40.5, 20.25]
+    assert record["timestamp"] == "2024-01-02T00:00:00"
+    assert record["feedback"] == "accepted:bread"
+
+
+def test_date_filters_are_start_inclusive_end_exclusive(session_factory):
+    lines = body(
+        session_factory, "transactions", "ndjson", start=datetime(2024, 1, 15, 12), end=datetime(2024, 2, 20, 18)
+    ).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [2, 3]
+
+
+def test_empty_export(session_factory):
+    assert body(session_factory, "item-feedback", "ndjson") == b""
+    assert body(session_factory, "item-feedback", "csv").decode().splitlines() == [
+        ",".join(export.EXPORTS["item-feedback"][2])
+    ]
+
+
+def test_parquet_round_trips_across_row_groups(session_factory):
+    pq = pytest.importorskip("pyarrow.parquet")
+    # Small chunks so the footer has to point at row groups from earlier drains
+    data = body(session_factory, "transactions", "parquet", chunk_rows=2)
+    parquet_file = pq.ParquetFile(io.BytesIO(data))
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column("id").to_pylist() == [1, 2, 3, 4, 5]
+    assert table.column("items").to_pylist() == [items for _, items in TRANSACTIONS]
+    assert table.column("date").to_pylist() == [date for date, _ in TRANSACTIONS]
+
+
+def test_parquet_predictions_schema(session_factory):
+    pq = pytest.importorskip("pyarrow.parquet")
+    table = pq.read_table(io.BytesIO(body(session_factory, "predictions", "parquet")))
+    assert table.to_pylist() == [{
+        "id": 1, "user_id": 1, "timestamp": datetime(2024, 1, 2), "input_data": ["milk"],
+        "output_data": ["bread", "eggs"], "probabilities": [40.5, 20.25], "feedback": "accepted:bread",
+    }]
+
+
+def test_chunk_sink_tell_counts_across_drains():
+    sink = export._ChunkSink()
+    sink.write(b"abc")
+    assert sink.drain() == b"abc"
+    sink.write(b"de")
+    assert sink.tell() == 5
+    assert sink.drain() == b"de"
+    assert sink.drain() == b""
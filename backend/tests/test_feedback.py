@@ -0,0 +1,132 @@
+import os
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import feedback
+import models
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def session_factory(request, tmp_path):
+    if request.param == "sqlite":
+        engine = create_engine(f"sqlite:///{tmp_path / 'feedback.db'}")
+    elif POSTGRES_URL:
+        engine = create_engine(POSTGRES_URL)
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public"))
+    else:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    models.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add_all([models.User(id=1, username="ann"), models.User(id=2, username="bob")])
+        db.add_all([
+            models.PredictionLog(id=1, user_id=1, timestamp=datetime(2024, 1, 1), output_data=["milk", "bread"]),
+            models.PredictionLog(id=2, user_id=1, timestamp=datetime(2024, 1, 1), output_data=["milk", "eggs"]),
+            models.PredictionLog(id=3, user_id=2, timestamp=datetime(2024, 1, 1), output_data=["milk"]),
+        ])
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def feedback_column(factory):
+    with factory() as db:
+        return dict(db.query(models.PredictionLog.id, models.PredictionLog.feedback))
+
+
+def stats(factory):
+    with factory() as db:
+        return {
+            row.item: (row.shown, row.accepted, row.rejected)
+            for row in db.query(models.ItemFeedbackStats)
+        }
+
+
+def test_feedback_value():
+    assert feedback.feedback_value("accepted", "milk") == "accepted:milk"
+    assert feedback.feedback_value("rejected") == "rejected"
+
+
+def test_flush_applies_owned_feedback_and_counts_items(session_factory):
+    buffer = feedback.FeedbackBuffer(session_factory)
+    buffer.add(1, [(1, "bread", "accepted"), (2, None, "rejected")])
+    # Prediction 3 belongs to user 2 and 99 doesn't exist
+    buffer.add(1, [(3, None, "rejected"), (99, None, "rejected")])
+
+    assert buffer.flush() == 2
+    assert feedback_column(session_factory) == {1: "accepted:bread", 2: "rejected", 3: None}
+    assert stats(session_factory) == {"milk": (2, 0, 1), "bread": (1, 1, 0), "eggs": (1, 0, 1)}
+
+
+def test_first_feedback_wins_across_flushes(session_factory):
+    buffer = feedback.FeedbackBuffer(session_factory)
+    buffer.add(1, [(1, "milk", "accepted")])
+    assert buffer.flush() == 1
+    buffer.add(1, [(1, None, "rejected")])
+    assert buffer.flush() == 0
+
+    assert feedback_column(session_factory)[1] == "accepted:milk"
+    assert stats(session_factory) == {"milk": (1, 1, 0), "bread": (1, 0, 0)}
+
+
+def test_first_feedback_wins_within_a_batch(session_factory):
+    buffer = feedback.FeedbackBuffer(session_factory)
+    buffer.add(1, [(1, "milk", "accepted"), (1, None, "rejected")])
+    assert buffer.flush() == 1
+
+    assert feedback_column(session_factory)[1] == "accepted:milk"
+    assert stats(session_factory) == {"milk": (1, 1, 0), "bread": (1, 0, 0)}
+
+
+def test_other_users_feedback_does_not_displace_the_owners(session_factory):
+    buffer = feedback.FeedbackBuffer(session_factory)
+    buffer.add(1, [(1, "milk", "accepted")])
+    # User 2 doesn't own prediction 1; arriving later must not drop user 1's event
+    buffer.add(2, [(1, None, "rejected")])
+    assert buffer.flush() == 1
+
+    assert feedback_column(session_factory)[1] == "accepted:milk"
+    assert stats(session_factory) == {"milk": (1, 1, 0), "bread": (1, 0, 0)}
+
+
+def test_stats_increment_existing_rows(session_factory):
+    buffer = feedback.FeedbackBuffer(session_factory)
+    buffer.add(1, [(1, "milk", "accepted")])
+    buffer.flush()
+    buffer.add(1, [(2, "milk", "accepted")])
+    buffer.add(2, [(3, None, "rejected")])
+    assert buffer.flush() == 2
+    assert stats(session_factory) == {"milk": (3, 2, 1), "bread": (1, 0, 0), "eggs": (1, 0, 0)}
+
+
+def test_concurrent_buffers_count_each_prediction_once(session_factory):
+    # Two workers receive feedback for the same predictions and flush at once
+    buffers = [feedback.FeedbackBuffer(session_factory) for _ in range(2)]
+    for buffer in buffers:
+        buffer.add(1, [(1, "milk", "accepted"), (2, None, "rejected")])
+    results = []
+    threads = [threading.Thread(target=lambda b=b: results.append(b.flush())) for b in buffers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) in ([0, 2], [1, 1])
+    assert stats(session_factory)["milk"] == (2, 1, 1)
+
+
+def test_full_buffer_signals_instead_of_flushing(session_factory):
+    buffer = feedback.FeedbackBuffer(session_factory, flush_size=2)
+    buffer.add(1, [(1, "milk", "accepted")])
+    assert not buffer.full.is_set()
+    buffer.add(1, [(2, None, "rejected")])
+    assert buffer.full.is_set()
+    # Nothing was written on the caller's thread
+    assert feedback_column(session_factory) == {1: None, 2: None, 3: None}
@@ -0,0 +1,63 @@
+import item_index
+
+ITEMS = ["whole milk", "butter milk", "milk chocolate", "yogurt", "rolls/buns", "mineral water", "misc. beverages"]
+POPULARITY = {"whole milk": 50, "butter milk": 5, "milk chocolate": 8, "yogurt": 30, "mineral water": 12}
+
+
+def names(results):
+    return [name for name, _ in results]
+
+
+def test_empty_query_ranks_by_popularity():
+    index = item_index.ItemIndex(ITEMS, POPULARITY)
+    assert index.search("", 3) == [("whole milk", 50), ("yogurt", 30), ("mineral water", 12)]
+
+
+def test_name_prefix_ranks_above_word_prefix():
+    index = item_index.ItemIndex(ITEMS, POPULARITY)
+    # "milk chocolate" starts with the query; the others only contain a word that does
+    assert names(index.search("milk")) == ["milk chocolate", "whole milk", "butter milk"]
+
+
+def test_short_queries_use_the_same_ranking():
+    index = item_index.ItemIndex(ITEMS, POPULARITY)
+    assert names(index.search("m")) == ["mineral water", "milk chocolate", "misc. beverages", "whole milk", "butter milk"]
+    assert names(index.search("mi", 2)) == ["mineral water", "milk chocolate"]
+    # Larger limits than the precomputed rankings hold fall back to a scan
+    assert names(index.search("mi", item_index.MAX_RESULTS + 1))[:3] == names(index.search("mi", 3))
+
+
+def test_query_is_normalized():
+    index = item_index.ItemIndex(ITEMS, POPULARITY)
+    assert names(index.search("  WHOLE   Mi ")) == ["whole milk"]
+
+
+def test_fuzzy_fallback_for_typos():
+    index = item_index.ItemIndex(ITEMS, POPULARITY)
+    assert names(index.search("yoghurt"))[0] == "yogurt"
+
+
+def test_set_popularity_reranks_and_changes_revision():
+    index = item_index.ItemIndex(ITEMS, POPULARITY)
+    revision = index.revision
+    index.set_popularity({"butter milk": 100})
+    assert index.revision != revision
+    assert names(index.search("", 1)) == ["butter milk"]
+    assert names(index.search("milk"))[1:] == ["butter milk", "whole milk"]
+
+
+def test_most_popular_is_a_precomputed_slice():
+    index = item_index.ItemIndex(ITEMS, POPULARITY)
+    assert index.most_popular(2) == [("whole milk", 50), ("yogurt", 30)]
+    index.set_popularity({"rolls/buns": 7})
+    assert index.most_popular(1) == [("rolls/buns", 7)]
+
+
+def test_search_against_captured_rankings_matches_their_revision():
+    index = item_index.ItemIndex(ITEMS, POPULARITY)
+    rankings = index.rankings
+    index.set_popularity({"butter milk": 100})
+    # A request that built its ETag from the old revision still gets the old results
+    assert rankings.revision != index.revision
+    assert index.search("", 1, rankings) == [("whole milk", 50)]
+    assert index.search("", 1) == [("butter milk", 100)]
@@ -0,0 +1,129 @@
+import os
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import models
+import partitions
+
+# Partitioning only applies to PostgreSQL; point this at a disposable database to test it
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    partitions.create_all(engine, models.Base.metadata)
+    return engine
+
+
+def add_logs(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(models.PredictionLog.__table__.insert(), [
+            {"user_id": 1, "timestamp": timestamp, "output_data": output, "feedback": feedback}
+            for timestamp, output, feedback in rows
+        ])
+
+
+def test_next_month_rolls_over_the_year():
+    assert partitions._next_month(date(2024, 1, 1)) == date(2024, 2, 1)
+    assert partitions._next_month(date(2024, 11, 1)) == date(2024, 12, 1)
+    assert partitions._next_month(date(2024, 12, 1)) == date(2025, 1, 1)
+
+
+def test_month_partitions_start_at_the_current_month():
+    assert list(partitions._month_partitions(date(2024, 11, 17), 2)) == [
+        date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1)
+    ]
+
+
+def test_drop_expired_deletes_old_rows_without_partitions(engine):
+    add_logs(engine, [
+        (datetime(2024, 1, 1, 12), ["milk"], None),
+        (datetime(2024, 6, 30, 23), ["milk"], None),
+        (datetime(2024, 7, 1, 1), ["milk"], None),
+    ])
+    assert partitions.drop_expired(engine, retention_days=30, today=date(2024, 7, 31)) == 2
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM prediction_logs")).scalar() == 1
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def rollup_engine(request):
+    if request.param == "sqlite":
+        yield create_engine("sqlite://")
+        return
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL not set")
+    engine = create_engine(POSTGRES_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public"))
+    partitions.create_all(engine, models.Base.metadata, today=date(2024, 3, 1))
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'shopper')"))
+    yield engine
+    engine.dispose()
+
+
+def test_rollup_counts_predictions_and_feedback_per_day(rollup_engine):
+    engine = rollup_engine
+    models.Base.metadata.create_all(bind=engine)
+    add_logs(engine, [
+        (datetime(2024, 3, 1, 9), ["milk", "bread"], "accepted:milk"),
+        (datetime(2024, 3, 1, 18), ["milk"], None),
+        (datetime(2024, 3, 2, 8), ["eggs"], "rejected"),
+        (datetime(2024, 3, 2, 9), None, None),
+    ])
+    db = sessionmaker(bind=engine)()
+    try:
+        assert partitions.rollup(db, today=date(2024, 3, 2)) == 2
+        rows = {
+            (row.day, row.item): (row.predictions, row.feedback)
+            for row in db.query(models.PredictionRollup)
+        }
+        assert rows == {
+            (date(2024, 3, 1), "milk"): (2, 1),
+            (date(2024, 3, 1), "bread"): (1, 1),
+            (date(2024, 3, 2), "eggs"): (1, 1),
+        }
+
+        # Recomputing the lookback window replaces rows instead of adding to them
+        add_logs(engine, [(datetime(2024, 3, 2, 20), ["eggs"], None)])
+        partitions.rollup(db, today=date(2024, 3, 2))
+        eggs = db.get(models.PredictionRollup, (date(2024, 3, 2), "eggs"))
+        assert (eggs.predictions, eggs.feedback) == (2, 1)
+    finally:
+        db.close()
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL not set")
+def test_postgres_partitions_recover_rows_from_default():
+    engine = create_engine(POSTGRES_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public"))
+    partitions.create_all(engine, models.Base.metadata, today=date(2024, 7, 15))
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'shopper')"))
+    # July is partitioned from the start; the others land in the default partition
+    add_logs(engine, [
+        (datetime(2024, 7, 15), ["milk"], None),
+        (datetime(2024, 5, 3), ["milk"], None),
+        (datetime(2023, 1, 1), ["milk"], None),
+    ])
+
+    def placement():
+        with engine.connect() as conn:
+            return dict(conn.execute(text(
+                "SELECT tableoid::regclass::text, count(*) FROM prediction_logs GROUP BY 1"
+            )).all())
+
+    assert placement() == {"prediction_logs_202407": 1, "prediction_logs_default": 2}
+    partitions.ensure_partitions(engine, today=date(2024, 7, 15))
+    assert placement() == {"prediction_logs_202407": 1, "prediction_logs_202405": 1, "prediction_logs_202301": 1}
+
+    assert partitions.drop_expired(engine, retention_days=180, today=date(2024, 7, 15)) == ["prediction_logs_202301"]
+    add_logs(engine, [(datetime(2022, 1, 1), ["milk"], None)])
+    partitions.drop_expired(engine, retention_days=180, today=date(2024, 7, 15))
+    assert placement() == {"prediction_logs_202407": 1, "prediction_logs_202405": 1}
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+import popular
+
+
+class FakeModel:
+    def __init__(self, version):
+        self.model = object()
+        self.version = version
+        self.batches = []
+
+    def predict_top_k(self, baskets, k=5):
+        self.batches.append(len(baskets))
+        return [[(f"after {basket[0]}", 50.0)] for basket in baskets]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_transactions(db, baskets):
+    db.add_all(models.Transaction(user_id=1, date=datetime(2024, 1, 1), items=items) for items in baskets)
+    db.commit()
+
+
+def test_basket_key_ignores_order_and_repeats():
+    assert popular.basket_key(["milk", "bread", "milk"]) == popular.basket_key(["bread", "milk"])
+    assert popular.basket_key(["milk"]) != popular.basket_key(["milk", "bread"])
+
+
+def test_lookup_only_answers_for_the_loaded_version():
+    table = popular.PopularTable()
+    table.entries = {popular.basket_key(["milk", "bread"]): [{"item": "butter", "probability": 40.0}]}
+    table.version = "v1"
+
+    assert table.lookup(["bread", "milk", "bread"], "v1") == [{"item": "butter", "probability": 40.0}]
+    assert table.lookup(["bread"], "v1") is None
+    assert table.lookup(["milk", "bread"], "v2") is None
+
+
+def test_refresh_scores_stale_baskets_in_chunks(db):
+    add_transactions(db, [[f"item {i}", "milk"] for i in range(10)])
+    model = FakeModel("v1")
+
+    assert popular.refresh(db, model, top_n=100, max_items=2, chunk_size=4)
+    # 10 one-item prefixes plus 10 two-item baskets
+    assert model.batches == [4, 4, 4, 4, 4]
+    rows = db.query(models.PopularBasket).all()
+    assert len(rows) == 20
+    assert {row.model_version for row in rows} == {"v1"}
+
+    # A new version recomputes; a rerun with nothing new or stale changes nothing
+    upgraded = FakeModel("v2")
+    assert popular.refresh(db, upgraded, top_n=3, max_items=2, chunk_size=2)
+    assert upgraded.batches == [2, 1]
+    assert not popular.refresh(db, upgraded, top_n=3, max_items=2, chunk_size=2)
+
+
+def test_refresh_counts_incrementally(db):
+    add_transactions(db, [["milk", "bread"]])
+    model = FakeModel("v1")
+    popular.refresh(db, model, top_n=10, max_items=2)
+    add_transactions(db, [["milk"]])
+    popular.refresh(db, model, top_n=10, max_items=2)
+
+    counts = dict(db.query(models.PopularBasket.basket_key, models.PopularBasket.count))
+    assert counts == {"milk": 2, popular.basket_key(["milk", "bread"]): 1}
+    assert popular.item_popularity(db) == {"milk": 2, "bread": 1}
+
+
+def test_table_loads_current_version_predictions(db):
+    add_transactions(db, [["milk", "bread"]])
+    popular.refresh(db, FakeModel("v1"), top_n=10, max_items=2)
+
+    table = popular.PopularTable()
+    assert table.is_stale(db, "v1")
+    table.load(db, "v1", top_n=10)
+    assert not table.is_stale(db, "v1")
+    assert table.lookup(["milk"], "v1") == [{"item": "after milk", "probability": 50.0}]
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models
+import shadow
+
+NOW = datetime(2024, 3, 20)
+
+
+class FakeCandidate:
+    version = "candidate-1"
+
+    def predict_top_k(self, baskets, k=5):
+        return [[("eggs", 60.0), ("milk", 40.0)] for _ in baskets]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'shadow.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(models.User(id=1, username="ann"))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def evaluation(timestamp, primary_items, candidate_items, candidate_version="candidate-1"):
+    return models.ShadowEvaluation(
+        timestamp=timestamp,
+        user_id=1,
+        basket=["bread"],
+        primary_version="primary-1",
+        candidate_version=candidate_version,
+        primary_items=primary_items,
+        candidate_items=candidate_items,
+        primary_latency_ms=2.0,
+        candidate_latency_ms=4.0,
+    )
+
+
+def test_sample_follows_the_rate(session_factory):
+    assert not shadow.ShadowEvaluator(FakeCandidate(), session_factory, 0.0).sample()
+    assert shadow.ShadowEvaluator(FakeCandidate(), session_factory, 1.0).sample()
+
+
+def test_submit_stores_the_comparison(session_factory):
+    evaluator = shadow.ShadowEvaluator(FakeCandidate(), session_factory, 1.0)
+    evaluator.submit(1, ["bread"], "primary-1", ["milk", "butter"], 3.0)
+    evaluator._executor.shutdown(wait=True)
+
+    with session_factory() as db:
+        row = db.query(models.ShadowEvaluation).one()
+    assert row.candidate_version == "candidate-1"
+    assert row.primary_items == ["milk", "butter"]
+    assert row.candidate_items == ["eggs", "milk"]
+    assert evaluator.pending == 0
+
+
+def test_report_compares_agreement_and_later_purchases(session_factory):
+    with session_factory() as db:
+        db.add_all([
+            evaluation(NOW - timedelta(days=10), ["milk", "butter"], ["milk", "eggs"]),
+            evaluation(NOW - timedelta(days=9), ["butter", "jam"], ["eggs", "jam"]),
+            # Another candidate's rows are not part of this report
+            evaluation(NOW - timedelta(days=9), ["milk"], ["milk"], candidate_version="candidate-0"),
+            models.Transaction(user_id=1, date=NOW - timedelta(days=8), items=["eggs", "bread"]),
+        ])
+        db.commit()
+        evaluator = shadow.ShadowEvaluator(FakeCandidate(), session_factory, 0.5, k=2)
+        report = evaluator.report(db, now=NOW)
+
+    assert report["samples"] == 2
+    assert report["top1_agreement"] == 0.5
+    assert report["topk_overlap"] == 0.5
+    assert report["candidate_latency_ms"]["p50"] == 4.0
+    assert report["purchases_evaluated"] == 2
+    assert report["primary_purchase_hit_rate"] == 0.0
+    assert report["candidate_purchase_hit_rate"] == 1.0
+
+
+def test_report_evaluates_closed_windows_behind_recent_samples(session_factory):
+    with session_factory() as db:
+        db.add_all(
+            evaluation(NOW - timedelta(days=10), ["milk"], ["eggs"]) for _ in range(20)
+        )
+        # More fresh samples than the limit, all with their purchase window still open
+        db.add_all(
+            evaluation(NOW - timedelta(hours=1), ["milk"], ["eggs"]) for _ in range(50)
+        )
+        db.add(models.Transaction(user_id=1, date=NOW - timedelta(days=9), items=["eggs"]))
+        db.commit()
+        evaluator = shadow.ShadowEvaluator(FakeCandidate(), session_factory, 0.5)
+        report = evaluator.report(db, limit=30, now=NOW)
+
+    assert report["samples"] == 30
+    assert report["purchases_evaluated"] == 20
+    assert report["candidate_purchase_hit_rate"] == 1.0
+    assert report["primary_purchase_hit_rate"] == 0.0
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import shared_model
+
+tf = pytest.importorskip("tensorflow")
+preprocessing = pytest.importorskip("sklearn.preprocessing")
+
+ITEMS = ["bread", "butter", "eggs", "milk", "yogurt"]
+BASKETS = [["milk", "bread"], ["eggs"], ["butter", "yogurt", "milk"], []]
+
+
+def build_model(extra_layer=None):
+    layers = [
+        tf.keras.Input(shape=(len(ITEMS),)),
+        tf.keras.layers.Dense(8, activation="relu"),
+        tf.keras.layers.Dropout(0.5),
+        tf.keras.layers.Dense(4, activation="tanh"),
+    ]
+    if extra_layer is not None:
+        layers.append(extra_layer)
+    layers.append(tf.keras.layers.Dense(len(ITEMS), activation="softmax"))
+    return tf.keras.Sequential(layers)
+
+
+@pytest.fixture
+def encoder():
+    mlb = preprocessing.MultiLabelBinarizer()
+    mlb.fit([ITEMS])
+    return mlb
+
+
+def test_publish_and_attach_match_keras(tmp_path, encoder):
+    model = build_model()
+    unique_items = {item: i for i, item in enumerate(encoder.classes_)}
+    shared_model.publish(model, encoder, unique_items, "v1", str(tmp_path))
+
+    version, shared, shared_encoder, shared_items = shared_model.attach(str(tmp_path))
+    assert version == "v1"
+    assert shared_model.current_version(str(tmp_path)) == "v1"
+    assert shared_items == unique_items
+
+    encoded = shared_encoder.transform(BASKETS)
+    np.testing.assert_array_equal(encoded, encoder.transform(BASKETS))
+    np.testing.assert_allclose(
+        shared.predict(encoded), model.predict(encoder.transform(BASKETS), verbose=0), rtol=1e-5, atol=1e-6
+    )
+
+
+def test_encoder_ignores_unknown_items(encoder):
+    shared_encoder = shared_model.SharedEncoder(np.asarray(encoder.classes_, dtype=str))
+    encoded = shared_encoder.transform([["milk", "caviar"]])
+    np.testing.assert_array_equal(encoded, encoder.transform([["milk"]]))
+
+
+def test_publish_replaces_older_versions(tmp_path, encoder):
+    unique_items = {item: i for i, item in enumerate(encoder.classes_)}
+    shared_model.publish(build_model(), encoder, unique_items, "v1", str(tmp_path))
+    shared_model.publish(build_model(), encoder, unique_items, "v2", str(tmp_path))
+    assert shared_model.current_version(str(tmp_path)) == "v2"
+    assert not (tmp_path / "v1").exists()
+
+
+def test_publish_rejects_unsupported_layers(tmp_path, encoder):
+    model = build_model(tf.keras.layers.BatchNormalization())
+    unique_items = {item: i for i, item in enumerate(encoder.classes_)}
+    with pytest.raises(shared_model.SharedModelError, match="BatchNormalization"):
+        shared_model.publish(model, encoder, unique_items, "v1", str(tmp_path))
+    assert shared_model.current_version(str(tmp_path)) is None
+
+
+def test_publish_rejects_unsupported_activations(tmp_path, encoder):
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(len(ITEMS),)),
+        tf.keras.layers.Dense(len(ITEMS), activation="gelu"),
+    ])
+    unique_items = {item: i for i, item in enumerate(encoder.classes_)}
+    with pytest.raises(shared_model.SharedModelError, match="gelu"):
+        shared_model.publish(model, encoder, unique_items, "v1", str(tmp_path))
@@ -0,0 +1,171 @@
+"""Shared helpers for the benchmark suite: data sampling, stats and baselines."""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime
+from importlib import metadata
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_ROOT, "backend")
+DATA_FILE = os.path.join(REPO_ROOT, "data", "Groceries_dataset.csv")
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Allow `import shared_model` etc. the same way the backend imports its modules
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def load_baskets(path=DATA_FILE):
+    """Group the groceries dataset into baskets (one per member and date)."""
+    grouped = defaultdict(list)
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            grouped[(row["Member_number"], row["Date"])].append(row["itemDescription"])
+    return list(grouped.values())
+
+
+def sample_basket(baskets, rng: random.Random, max_items=5):
+    """Pick a basket prefix, mirroring how predictions are requested mid-shop."""
+    basket = rng.choice(baskets)
+    return basket[: rng.randint(1, min(len(basket), max_items))]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies_s, elapsed_s, rows_per_call=1, errors=0):
+    """Summarize per-call latencies (seconds) into milliseconds and throughput."""
+    values = sorted(latencies_s)
+    calls = len(values)
+    return {
+        "calls": calls,
+        "errors": errors,
+        "p50_ms": round(percentile(values, 50) * 1000, 4),
+        "p95_ms": round(percentile(values, 95) * 1000, 4),
+        "p99_ms": round(percentile(values, 99) * 1000, 4),
+        "mean_ms": round(sum(values) / calls * 1000, 4) if calls else 0.0,
+        "throughput_per_s": round(calls * rows_per_call / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+    }
+
+
+def _package_version(*names):
+    # Read from package metadata so recording it never imports TensorFlow
+    for name in names:
+        try:
+            return metadata.version(name)
+        except metadata.PackageNotFoundError:
+            pass
+    return None
+
+
+def build_report(suite, results, config):
+    return {
+        "suite": suite,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": _package_version("numpy"),
+            "tensorflow": _package_version("tensorflow", "tensorflow-cpu"),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": config,
+        "results": results,
+    }
+
+
+def write_report(report, output=None):
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+def baseline_path(suite):
+    return os.path.join(BASELINE_DIR, f"{suite}.json")
+
+
+def save_baseline(report):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = baseline_path(report["suite"])
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"Saved baseline to {path}", file=sys.stderr)
+
+
+def compare_to_baseline(report, tolerance, min_delta_ms=0.0):
+    """Return a list of regressions against the stored baseline for this suite.
+
+    A benchmark regresses when its p95 latency grows, or its throughput drops,
+    by more than ``tolerance`` (a fraction) relative to the baseline and the
+    per-call time grew by more than ``min_delta_ms``, which keeps timer noise
+    on microsecond-scale stages from failing the run. Returns None if there is
+    no baseline to compare with.
+    """
+    path = baseline_path(report["suite"])
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for name, base in baseline["results"].items():
+        current = report["results"].get(name)
+        if current is None:
+            continue
+        if (base["p95_ms"] > 0 and current["p95_ms"] > base["p95_ms"] * (1 + tolerance)
+                and current["p95_ms"] - base["p95_ms"] > min_delta_ms):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if (base["throughput_per_s"] > 0 and current["throughput_per_s"] < base["throughput_per_s"] * (1 - tolerance)
+                and current["mean_ms"] - base["mean_ms"] > min_delta_ms):
+            regressions.append(
+                f"{name}: throughput {current['throughput_per_s']}/s vs baseline {base['throughput_per_s']}/s"
+            )
+        if current.get("errors", 0) > base.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors vs baseline {base.get('errors', 0)}")
+    return regressions
+
+
+def add_common_arguments(parser):
+    parser.add_argument("--output", type=str, default=None,
+                      help="Also write the JSON report to this file")
+    parser.add_argument("--save-baseline", action="store_true",
+                      help="Store this run as the baseline for future comparisons")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                      help="Allowed relative regression against the baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                      help="Ignore regressions smaller than this many milliseconds per call")
+    parser.add_argument("--seed", type=int, default=42,
+                      help="Random seed for basket sampling")
+    parser.add_argument("--require-baseline", action=argparse.BooleanOptionalAction, default=bool(os.getenv("CI")),
+                      help="Fail when no baseline exists for the suite (default: on when CI is set)")
+
+
+def finish(report, args):
+    """Write the report, then save or compare the baseline; returns an exit code."""
+    write_report(report, args.output)
+    if args.save_baseline:
+        save_baseline(report)
+        return 0
+    regressions = compare_to_baseline(report, args.tolerance, args.min_delta_ms)
+    if regressions is None:
+        print(f"No baseline at {baseline_path(report['suite'])}; run with --save-baseline to create one",
+              file=sys.stderr)
+        return 1 if args.require_baseline else 0
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
@@ -0,0 +1,212 @@
+"""End-to-end load generator for the backend API.
+
+Starts the FastAPI app under uvicorn against a throwaway SQLite database,
+registers synthetic users, then drives a mix of prediction, transaction
+write and transaction read requests from concurrent clients with baskets
+sampled from data/Groceries_dataset.csv.
+
+    python benchmarks/load_test.py --users 20 --concurrency 16 --duration 30
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from common import BACKEND_DIR, DATA_FILE, add_common_arguments, build_report, finish, load_baskets, sample_basket, summarize
+
+SCENARIOS = ("predict_next_item", "create_transaction", "read_transactions")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(base_url, method, path, body=None, token=None, form=False, timeout=30):
+    headers = {}
+    data = None
+    if body is not None:
+        if form:
+            data = urllib.parse.urlencode(body).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        else:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(f"{base_url}{path}", data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def start_server(port, database_url, workers, log_file):
+    env = dict(os.environ, DATABASE_URL=database_url, LOG_LEVEL="WARNING")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if request(base_url, "GET", "/health", timeout=1)[0] == 200:
+                return process, base_url
+        except OSError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy within 120s")
+
+
+def register_users(base_url, count, run_id):
+    tokens = []
+    for i in range(count):
+        username = f"bench_{run_id}_{i}"
+        password = "bench-password"
+        status, body = request(base_url, "POST", "/api/v1/users/", {
+            "username": username,
+            "email": f"{username}@example.com",
+            "password": password,
+        })
+        if status != 200:
+            raise RuntimeError(f"Could not create user {username}: {status} {body[:200]}")
+        status, body = request(base_url, "POST", "/token",
+                               {"username": username, "password": password}, form=True)
+        if status != 200:
+            raise RuntimeError(f"Could not log in as {username}: {status} {body[:200]}")
+        tokens.append(json.loads(body)["access_token"])
+    return tokens
+
+
+def run_load(base_url, tokens, baskets, args):
+    weights = [args.predict_weight, args.write_weight, args.read_weight]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    stop_at = time.monotonic() + args.duration
+
+    def client(worker_id):
+        rng = random.Random(args.seed + worker_id)
+        while time.monotonic() < stop_at:
+            scenario = rng.choices(SCENARIOS, weights=weights)[0]
+            token = rng.choice(tokens)
+            start = time.perf_counter()
+            try:
+                if scenario == "predict_next_item":
+                    status, _ = request(base_url, "POST", "/api/v1/predictions/next-item",
+                                        {"items": sample_basket(baskets, rng)}, token=token)
+                elif scenario == "create_transaction":
+                    status, _ = request(base_url, "POST", "/api/v1/transactions/",
+                                        {"items": rng.choice(baskets)}, token=token)
+                else:
+                    status, _ = request(base_url, "GET", "/api/v1/transactions/?limit=100", token=token)
+            except OSError:
+                status = None
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 200:
+                    latencies[scenario].append(elapsed)
+                else:
+                    errors[scenario] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(client, range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    results = {
+        scenario: summarize(latencies[scenario], elapsed, errors=errors[scenario])
+        for scenario in SCENARIOS
+        if latencies[scenario] or errors[scenario]
+    }
+    all_latencies = [value for scenario in SCENARIOS for value in latencies[scenario]]
+    results["overall"] = summarize(all_latencies, elapsed, errors=sum(errors.values()))
+    return results
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Load-test the backend API against SQLite")
+    parser.add_argument("--data", type=str, default=DATA_FILE,
+                      help="Path to the grocery dataset CSV")
+    parser.add_argument("--base-url", type=str, default=None,
+                      help="Target an already running server instead of starting one")
+    parser.add_argument("--users", type=int, default=20,
+                      help="Synthetic users to register")
+    parser.add_argument("--concurrency", type=int, default=16,
+                      help="Concurrent client threads")
+    parser.add_argument("--duration", type=float, default=30.0,
+                      help="Seconds of load after setup")
+    parser.add_argument("--workers", type=int, default=1,
+                      help="uvicorn workers for the spawned server")
+    parser.add_argument("--predict-weight", type=float, default=0.7,
+                      help="Share of requests that are predictions")
+    parser.add_argument("--write-weight", type=float, default=0.1,
+                      help="Share of requests that create transactions")
+    parser.add_argument("--read-weight", type=float, default=0.2,
+                      help="Share of requests that list transactions")
+    add_common_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    baskets = load_baskets(args.data)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        process = None
+        log_path = os.path.join(tmp_dir, "server.log")
+        with open(log_path, "w") as log_file:
+            try:
+                if args.base_url:
+                    base_url = args.base_url
+                else:
+                    database_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+                    process, base_url = start_server(free_port(), database_url, args.workers, log_file)
+                tokens = register_users(base_url, args.users, int(time.time()))
+                results = run_load(base_url, tokens, baskets, args)
+            except Exception:
+                log_file.flush()
+                with open(log_path) as f:
+                    sys.stderr.write(f.read()[-4000:])
+                raise
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait(timeout=30)
+
+    config = {
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "workers": args.workers,
+        # Without SHARED_MODEL_DIR the spawned server predicts through Keras
+        "shared_model": bool(os.getenv("SHARED_MODEL_DIR")) if not args.base_url else None,
+        "mix": {"predict": args.predict_weight, "write": args.write_weight, "read": args.read_weight},
+        "seed": args.seed,
+    }
+    return finish(build_report("load", results, config), args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
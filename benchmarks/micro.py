@@ -0,0 +1,173 @@
+"""Micro-benchmarks for the prediction pipeline stages.
+
+Times encode, forward pass and top-k for a grid of batch sizes and catalog
+sizes. Baskets are sampled from data/Groceries_dataset.csv; catalogs larger
+than the dataset's vocabulary are padded with synthetic items. The forward pass
+uses random weights with the trained model's architecture, timed both through
+the memory-mapped numpy path of shared-memory serving ("forward") and through
+Keras ``model.predict``, which serves requests when SHARED_MODEL_DIR is unset
+("forward_keras", skipped without TensorFlow).
+
+    python benchmarks/micro.py --catalog-sizes 169,10000,50000 --batch-sizes 1,32
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import DATA_FILE, add_common_arguments, build_report, finish, load_baskets, sample_basket, summarize
+import shared_model
+
+HIDDEN_UNITS = (256, 128)  # matches build_model in ml/train_model.py
+TOP_K = 5
+
+
+def build_catalog(baskets, size):
+    items = sorted({item for basket in baskets for item in basket})
+    if size <= len(items):
+        return items[:size]
+    return items + [f"synthetic item {i}" for i in range(size - len(items))]
+
+
+def write_synthetic_model(directory, n_items, rng: np.random.Generator):
+    dims = (n_items,) + HIDDEN_UNITS + (n_items,)
+    activations = ["relu"] * len(HIDDEN_UNITS) + ["softmax"]
+    for i, (fan_in, fan_out) in enumerate(zip(dims[:-1], dims[1:])):
+        kernel = rng.standard_normal((fan_in, fan_out), dtype=np.float32) / np.sqrt(fan_in)
+        np.save(os.path.join(directory, f"layer{i}_kernel.npy"), kernel)
+        np.save(os.path.join(directory, f"layer{i}_bias.npy"), np.zeros(fan_out, dtype=np.float32))
+    with open(os.path.join(directory, shared_model.MANIFEST_FILE), "w") as f:
+        json.dump({"version": f"synthetic-{n_items}", "activations": activations}, f)
+    return shared_model.SharedModel(directory)
+
+
+def build_keras_model(shared, n_items):
+    """A Keras model with the same weights as the synthetic shared model."""
+    import tensorflow as tf
+
+    activations = ["relu"] * len(HIDDEN_UNITS) + ["softmax"]
+    model = tf.keras.Sequential(
+        [tf.keras.Input(shape=(n_items,))]
+        + [tf.keras.layers.Dense(units, activation=activation)
+           for units, activation in zip(HIDDEN_UNITS + (n_items,), activations)]
+    )
+    for layer, (kernel, bias, _) in zip(model.layers, shared.layers):
+        layer.set_weights([np.asarray(kernel), np.asarray(bias)])
+    return model
+
+
+def time_calls(fn, inputs, iterations, warmup):
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        fn(inputs[i % len(inputs)])
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+
+def topk_argsort(prediction):
+    return np.argsort(prediction, axis=1)[:, -TOP_K:][:, ::-1]
+
+
+def topk_argpartition(prediction):
+    part = np.argpartition(prediction, -TOP_K, axis=1)[:, -TOP_K:]
+    order = np.argsort(np.take_along_axis(prediction, part, axis=1), axis=1)[:, ::-1]
+    return np.take_along_axis(part, order, axis=1)
+
+
+def run(args):
+    baskets = load_baskets(args.data)
+    rng = random.Random(args.seed)
+    np_rng = np.random.default_rng(args.seed)
+    results = {}
+
+    try:
+        from sklearn.preprocessing import MultiLabelBinarizer
+    except ImportError:
+        MultiLabelBinarizer = None
+        print("scikit-learn not installed; skipping MultiLabelBinarizer encode benchmark", file=sys.stderr)
+    try:
+        import tensorflow  # noqa: F401
+        has_tensorflow = True
+    except ImportError:
+        has_tensorflow = False
+        print("TensorFlow not installed; skipping Keras forward benchmark", file=sys.stderr)
+
+    for catalog_size in args.catalog_sizes:
+        catalog = build_catalog(baskets, catalog_size)
+        encoder = shared_model.SharedEncoder(np.asarray(catalog, dtype=str))
+        mlb = MultiLabelBinarizer(classes=catalog).fit([catalog]) if MultiLabelBinarizer else None
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            model = write_synthetic_model(model_dir, catalog_size, np_rng)
+            keras_model = build_keras_model(model, catalog_size) if has_tensorflow else None
+
+            for batch_size in args.batch_sizes:
+                batches = [
+                    [sample_basket(baskets, rng) for _ in range(batch_size)]
+                    for _ in range(args.distinct_batches)
+                ]
+                encoded = [encoder.transform(batch) for batch in batches]
+                predictions = [model.predict(x) for x in encoded]
+                suffix = f"catalog={catalog_size},batch={batch_size}"
+
+                def record(stage, fn, inputs):
+                    latencies, elapsed = time_calls(fn, inputs, args.iterations, args.warmup)
+                    results[f"{stage}[{suffix}]"] = summarize(latencies, elapsed, rows_per_call=batch_size)
+
+                record("encode_shared", encoder.transform, batches)
+                if mlb is not None:
+                    record("encode_mlb", mlb.transform, batches)
+                record("forward", model.predict, encoded)
+                if keras_model is not None:
+                    record("forward_keras", lambda x: keras_model.predict(x, verbose=0), encoded)
+                record("topk_argsort", topk_argsort, predictions)
+                record("topk_argpartition", topk_argpartition, predictions)
+
+    return results
+
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Micro-benchmark the prediction pipeline stages")
+    parser.add_argument("--data", type=str, default=DATA_FILE,
+                      help="Path to the grocery dataset CSV")
+    parser.add_argument("--catalog-sizes", type=parse_int_list, default=[169, 1000, 10000, 50000],
+                      help="Comma-separated catalog sizes")
+    parser.add_argument("--batch-sizes", type=parse_int_list, default=[1, 8, 32, 128],
+                      help="Comma-separated batch sizes")
+    parser.add_argument("--iterations", type=int, default=200,
+                      help="Timed calls per benchmark")
+    parser.add_argument("--warmup", type=int, default=20,
+                      help="Untimed calls before each benchmark")
+    parser.add_argument("--distinct-batches", type=int, default=16,
+                      help="Distinct input batches cycled through per benchmark")
+    add_common_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    results = run(args)
+    config = {
+        "catalog_sizes": args.catalog_sizes,
+        "batch_sizes": args.batch_sizes,
+        "iterations": args.iterations,
+        "seed": args.seed,
+    }
+    return finish(build_report("micro", results, config), args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,57 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
+import { searchItems } from '../services/itemService';
 
 interface ItemSelectorProps {
   value: string;
   onChange: (value: string) => void;
 }
 
+const SEARCH_DEBOUNCE_MS = 150;
+const MIN_QUERY_LENGTH = 2;
+
 const ItemSelector: React.FC<ItemSelectorProps> = ({ value, onChange }) => {
+  const [suggestions, setSuggestions] = useState<string[]>([]);
+
+  useEffect(() => {
+    if (value.trim().length < MIN_QUERY_LENGTH) {
+      setSuggestions([]);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const results = await searchItems(value);
+        if (!cancelled) {
+          setSuggestions(results.map((result) => result.name));
+        }
+      } catch (error) {
+        console.error('Failed to search items', error);
+      }
+    }, SEARCH_DEBOUNCE_MS);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [value]);
+
   return (
-    <input
-      type="text"
-      value={value}
-      onChange={(e) => onChange(e.target.value)}
-      placeholder="Enter or select an item"
-      className="p-2 border rounded-md w-full"
-    />
+    <>
+      <input
+        type="text"
+        value={value}
+        onChange={(e) => onChange(e.target.value)}
+        placeholder="Enter or select an item"
+        className="p-2 border rounded-md w-full"
+        list="item-suggestions"
+      />
+      <datalist id="item-suggestions">
+        {suggestions.map((name) => (
+          <option key={name} value={name} />
+        ))}
+      </datalist>
+    </>
   );
 };
 
@@ -1,9 +1,12 @@
 import React, { useEffect, useState } from 'react';
-import { ModelDeployment } from '../types';
+import { ModelDeployment, ShadowReport } from '../types';
 import axios from 'axios';
+import { getShadowReport } from '../services/modelService';
 
 const AdminModelPage: React.FC = () => {
   const [models, setModels] = useState<ModelDeployment[]>([]);
+  const [shadowReport, setShadowReport] = useState<ShadowReport | null>(null);
+  const [shadowError, setShadowError] = useState<string | null>(null);
 
   useEffect(() => {
     const fetchModels = async () => {
@@ -15,9 +18,21 @@ const AdminModelPage: React.FC = () => {
       }
     };
 
+    const fetchShadowReport = async () => {
+      try {
+        setShadowReport(await getShadowReport());
+      } catch (error) {
+        console.error('Failed to fetch shadow report', error);
+        setShadowError(error instanceof Error ? error.message : 'Failed to get shadow report');
+      }
+    };
+
     fetchModels();
+    fetchShadowReport();
   }, []);
 
+  const percent = (value: number) => `${(value * 100).toFixed(1)}%`;
+
   return (
     <div>
       <h1 className="text-2xl font-semibold mb-4">Model Deployments</h1>
@@ -32,6 +47,36 @@ const AdminModelPage: React.FC = () => {
           </div>
         ))}
       </div>
+
+      {shadowError && <p className="mt-8 text-red-600">Shadow evaluation: {shadowError}</p>}
+
+      {shadowReport && (
+        <div className="mt-8">
+          <h2 className="text-xl font-semibold mb-4">Shadow Evaluation</h2>
+          <div className="border p-4 rounded shadow-sm bg-white space-y-1">
+            <p>Primary: {shadowReport.primary_version ?? 'N/A'}</p>
+            <p>Candidate: {shadowReport.candidate_version ?? 'N/A'}</p>
+            <p>
+              Samples: {shadowReport.samples} ({percent(shadowReport.sample_rate)} sampled,{' '}
+              {shadowReport.dropped} dropped)
+            </p>
+            <p>
+              Primary latency p50/p95/p99: {shadowReport.primary_latency_ms.p50.toFixed(1)} /{' '}
+              {shadowReport.primary_latency_ms.p95.toFixed(1)} / {shadowReport.primary_latency_ms.p99.toFixed(1)} ms
+            </p>
+            <p>
+              Candidate latency p50/p95/p99: {shadowReport.candidate_latency_ms.p50.toFixed(1)} /{' '}
+              {shadowReport.candidate_latency_ms.p95.toFixed(1)} / {shadowReport.candidate_latency_ms.p99.toFixed(1)} ms
+            </p>
+            <p>Top-1 agreement: {percent(shadowReport.top1_agreement)}</p>
+            <p>Top-k overlap: {percent(shadowReport.topk_overlap)}</p>
+            <p>
+              Purchase hit rate (primary vs candidate, {shadowReport.purchases_evaluated} evaluated):{' '}
+              {percent(shadowReport.primary_purchase_hit_rate)} vs {percent(shadowReport.candidate_purchase_hit_rate)}
+            </p>
+          </div>
+        </div>
+      )}
     </div>
   );
 };
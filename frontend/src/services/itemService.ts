@@ -0,0 +1,19 @@
+import axios from 'axios';
+import { ItemSearchResult } from '../types';
+
+// Use the same base URL as in authService.ts
+const API_URL = process.env.REACT_APP_API_URL || 'https://smartbasket-u8bn.onrender.com/api/v1';
+
+export const searchItems = async (query: string, limit = 10): Promise<ItemSearchResult[]> => {
+  try {
+    const response = await axios.get(`${API_URL}/items/search`, {
+      params: { q: query, limit }
+    });
+    return response.data;
+  } catch (error) {
+    if (axios.isAxiosError(error) && error.response) {
+      throw new Error(error.response.data.detail || 'Failed to search items');
+    }
+    throw new Error('Network error occurred');
+  }
+};
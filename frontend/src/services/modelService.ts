@@ -0,0 +1,24 @@
+import axios from 'axios';
+import { ShadowReport } from '../types';
+import { getAuthHeader } from './authService';
+
+// Use the same base URL as in authService.ts
+const API_URL = process.env.REACT_APP_API_URL || 'https://smartbasket-u8bn.onrender.com/api/v1';
+
+// Resolves to null when no candidate model is being shadowed
+export const getShadowReport = async (): Promise<ShadowReport | null> => {
+  try {
+    const response = await axios.get(`${API_URL}/models/shadow/report`, {
+      headers: await getAuthHeader()
+    });
+    return response.data;
+  } catch (error) {
+    if (axios.isAxiosError(error) && error.response) {
+      if (error.response.status === 404) {
+        return null;
+      }
+      throw new Error(error.response.data.detail || 'Failed to get shadow report');
+    }
+    throw new Error('Network error occurred');
+  }
+};
@@ -40,6 +40,7 @@ export interface User {
   }
   
   export interface Prediction {
+    id?: number;
     basket: string[];
     predicted_items: PredictionItem[];
     timestamp: string;
@@ -55,6 +56,12 @@ export interface User {
     feedback?: string;
   }
   
+  // Item related types
+  export interface ItemSearchResult {
+    name: string;
+    popularity: number;
+  }
+  
   // Transaction related types
   export interface Transaction {
     id: number;
@@ -85,6 +92,27 @@ export interface User {
     metrics: ModelMetrics;
   }
   
+  export interface LatencySummary {
+    p50: number;
+    p95: number;
+    p99: number;
+  }
+  
+  export interface ShadowReport {
+    primary_version: string | null;
+    candidate_version: string | null;
+    sample_rate: number;
+    samples: number;
+    dropped: number;
+    primary_latency_ms: LatencySummary;
+    candidate_latency_ms: LatencySummary;
+    top1_agreement: number;
+    topk_overlap: number;
+    purchases_evaluated: number;
+    primary_purchase_hit_rate: number;
+    candidate_purchase_hit_rate: number;
+  }
+  
   export interface ModelDeploymentCreate {
     model_version: string;
     metrics: ModelMetrics;
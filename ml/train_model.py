@@ -14,6 +14,7 @@ from sklearn.preprocessing import MultiLabelBinarizer
 from sklearn.metrics import classification_report
 import argparse
 import logging
+import urllib.request
 
 # Configure logging
 logging.basicConfig(
@@ -34,6 +35,60 @@ def load_data(file_path):
         logger.error(f"Error loading data: {e}")
         raise
 
+def load_export(url, token=None):
+    """Stream transactions from the backend's NDJSON export into the CSV's long format"""
+    logger.info(f"Streaming transactions from {url}")
+    
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"} if token else {})
+    rows = []
+    with urllib.request.urlopen(request) as response:
+        # One transaction per line; items become one row each, as in Groceries_dataset.csv
+        for line in response:
+            if not line.strip():
+                continue
+            transaction = json.loads(line)
+            for item in transaction["items"] or []:
+                rows.append((transaction["user_id"], transaction["id"], item))
+    
+    df = pd.DataFrame(rows, columns=["Member_number", "Date", "itemDescription"])
+    logger.info(f"Loaded {len(df)} transaction items from export")
+    return df
+
+def load_feedback_stats(url, token=None):
+    """Stream per-item feedback counts from the backend's item-feedback NDJSON export"""
+    logger.info(f"Streaming item feedback stats from {url}")
+    
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"} if token else {})
+    stats = {}
+    with urllib.request.urlopen(request) as response:
+        for line in response:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            stats[row["item"]] = (row["shown"], row["accepted"])
+    
+    logger.info(f"Loaded feedback stats for {len(stats)} items")
+    return stats
+
+def compute_sample_weights(y, feedback_stats, prior_strength=20.0, max_weight=3.0):
+    """Weight training examples by how often their target item is accepted when recommended"""
+    total_shown = sum(shown for shown, _ in feedback_stats.values())
+    total_accepted = sum(accepted for _, accepted in feedback_stats.values())
+    if total_shown == 0 or total_accepted == 0:
+        return np.ones(len(y))
+    global_rate = total_accepted / total_shown
+    
+    # Smooth each item's acceptance rate toward the global rate so rarely shown items stay near 1
+    item_weights = {
+        item: (accepted + prior_strength * global_rate) / (shown + prior_strength) / global_rate
+        for item, (shown, accepted) in feedback_stats.items()
+    }
+    weights = np.array([item_weights.get(item, 1.0) for item in y])
+    weights = np.clip(weights, 1.0 / max_weight, max_weight)
+    
+    logger.info(f"Sample weights: min={weights.min():.3f}, mean={weights.mean():.3f}, max={weights.max():.3f}")
+    return weights / weights.mean()
+
 def preprocess_data(df):
     """Preprocess the transaction data into sequence format"""
     logger.info("Preprocessing data")
@@ -98,7 +153,7 @@ def build_model(input_dim, output_dim, dropout_rate=0.2):
     logger.info(f"Model compiled successfully")
     return model
 
-def train_model(model, X_train, y_train, X_val, y_val, epochs=30, batch_size=32, model_dir="models"):
+def train_model(model, X_train, y_train, X_val, y_val, epochs=30, batch_size=32, model_dir="models", sample_weight=None):
     """Train the model with early stopping and checkpoints"""
     logger.info(f"Training model with {len(X_train)} samples")
     
@@ -129,6 +184,7 @@ def train_model(model, X_train, y_train, X_val, y_val, epochs=30, batch_size=32,
         validation_data=(X_val, y_val),
         epochs=epochs,
         batch_size=batch_size,
+        sample_weight=sample_weight,
         callbacks=callbacks,
         verbose=1
     )
@@ -223,6 +279,14 @@ def parse_arguments():
     parser = argparse.ArgumentParser(description="Train a grocery prediction model")
     parser.add_argument("--data", type=str, default="./data/Groceries_dataset.csv",
                       help="Path to the grocery dataset CSV")
+    parser.add_argument("--export-url", type=str, default=None,
+                      help="Backend NDJSON transactions export URL to train from instead of --data "
+                           "(e.g. http://backend:8000/api/v1/admin/export/transactions?start=2025-01-01)")
+    parser.add_argument("--feedback-url", type=str, default=None,
+                      help="Backend item-feedback export URL; weights examples by item acceptance rate "
+                           "(e.g. http://backend:8000/api/v1/admin/export/item-feedback)")
+    parser.add_argument("--token", type=str, default=os.getenv("SMARTBASKET_TOKEN"),
+                      help="Admin bearer token for the export URLs (defaults to $SMARTBASKET_TOKEN)")
     parser.add_argument("--model-dir", type=str, default="./models",
                       help="Directory to save model artifacts")
     parser.add_argument("--epochs", type=int, default=30,
@@ -244,21 +308,28 @@ def main():
     
     try:
         # Load and preprocess data
-        df = load_data(args.data)
+        if args.export_url:
+            df = load_export(args.export_url, args.token)
+        else:
+            df = load_data(args.data)
         X, y = preprocess_data(df)
         X_encoded, y_encoded, mlb, unique_items = encode_data(X, y)
         
+        # Optional per-example weights from live prediction feedback
+        feedback_stats = load_feedback_stats(args.feedback_url, args.token) if args.feedback_url else None
+        sample_weights = compute_sample_weights(y, feedback_stats) if feedback_stats else np.ones(len(y))
+        
         # Split data into train, validation, and test sets
-        X_temp, X_test, y_temp, y_test = train_test_split(
-            X_encoded, y_encoded, 
+        X_temp, X_test, y_temp, y_test, w_temp, _ = train_test_split(
+            X_encoded, y_encoded, sample_weights,
             test_size=args.test_size,
             random_state=42
         )
         
         # From the remaining data, create validation set
         val_ratio = args.val_size / (1 - args.test_size)
-        X_train, X_val, y_train, y_val = train_test_split(
-            X_temp, y_temp,
+        X_train, X_val, y_train, y_val, w_train, _ = train_test_split(
+            X_temp, y_temp, w_temp,
             test_size=val_ratio,
             random_state=42
         )
@@ -280,7 +351,8 @@ def main():
             X_val, y_val,
             epochs=args.epochs,
             batch_size=args.batch_size,
-            model_dir=args.model_dir
+            model_dir=args.model_dir,
+            sample_weight=w_train if feedback_stats else None
         )
         
         # Evaluate the model